@@ -3,11 +3,17 @@
 🚀 COSMIC DEFENDER - Automatic Build Script
 Created by AndreyVV
 
-This script automatically builds .exe and .apk files from the source code.
-Run this script to generate ready-to-play game files!
+Builds the .exe and .apk files and the download packages from the source
+code, without prompting. Every stage hashes its inputs (sources, generated
+configs, interpreter and package versions) and is skipped when nothing
+changed since its last successful run and its artifact is still there, so
+a rebuild with no changes finishes in seconds. Pinned packages are checked
+offline; pip only runs with --install.
 
 Usage:
     python AUTO_BUILD.py
+    python AUTO_BUILD.py --target exe --target packages --output build_report.json
+    python AUTO_BUILD.py --target apk --install --force
 
 Requirements:
     - Python 3.8+
@@ -18,34 +24,37 @@ Requirements:
 
 import os
 import sys
-import subprocess
+import json
+import time
+import hashlib
+import argparse
 import platform
+import py_compile
+import subprocess
+
+GAME_SOURCE = "osmic_defender_game.py"
+TARGET_NAME = "CosmicDefender.exe" if sys.platform == "win32" else "CosmicDefender"
+BUILD_DIR = "build"
+APK_DIR = "bin"
+STATE_PATH = os.path.join(BUILD_DIR, "auto_build_state.json")
+
+# None pins accept any installed version
+PINNED_PACKAGES = {
+    'pygame': "2.5.2",
+    'cx-Freeze': "6.15.10",
+    'numpy': None,
+}
+
+TARGETS = ('requirements', 'compile', 'exe', 'apk', 'packages')
+DEFAULT_TARGETS = ('requirements', 'compile', 'exe', 'packages')
 
-def install_requirements():
-    """Install required packages"""
-    print("🔧 Installing requirements...")
-    
-    packages = [
-        "pygame==2.5.2",
-        "cx-Freeze==6.15.10"
-    ]
-    
-    for package in packages:
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-            print(f"✅ Installed {package}")
-        except subprocess.CalledProcessError:
-            print(f"❌ Failed to install {package}")
-
-def create_setup_py():
-    """Create setup.py for cx-Freeze"""
-    setup_content = '''
+SETUP_PY = '''
 import sys
 from cx_Freeze import setup, Executable
 
 # Dependencies are automatically detected, but it might need fine tuning.
 build_exe_options = {
-    "packages": ["pygame", "random", "math", "sys"],
+    "packages": ["pygame", "numpy", "random", "math", "sys"],
     "excludes": ["tkinter"],
     "include_files": [],
     "optimize": 2
@@ -61,17 +70,11 @@ setup(
     version="1.0",
     description="🚀 Epic Space Shooter Game by AndreyVV",
     options={"build_exe": build_exe_options},
-    executables=[Executable("cosmic_defender_game.py", base=base, target_name="CosmicDefender.exe")]
+    executables=[Executable("%s", base=base, target_name="%s")]
 )
-'''
-    
-    with open("setup.py", "w") as f:
-        f.write(setup_content)
-    print("✅ Created setup.py")
-
-def create_buildozer_spec():
-    """Create buildozer.spec for Android"""
-    spec_content = '''[app]
+''' % (GAME_SOURCE, TARGET_NAME)
+
+BUILDOZER_SPEC = '''[app]
 title = Cosmic Defender
 package.name = cosmicdefender
 package.domain = org.andreyvv.cosmicdefender
@@ -88,74 +91,8 @@ log_level = 2
 [app]
 android.permissions = INTERNET,WRITE_EXTERNAL_STORAGE
 '''
-    
-    with open("buildozer.spec", "w") as f:
-        f.write(spec_content)
-    print("✅ Created buildozer.spec")
-
-def build_windows_exe():
-    """Build Windows .exe file"""
-    print("🖥️ Building Windows .exe...")
-    
-    try:
-        # Create setup.py
-        create_setup_py()
-        
-        # Build the executable
-        subprocess.check_call([sys.executable, "setup.py", "build"])
-        
-        # Find the built exe
-        build_dir = "build"
-        for root, dirs, files in os.walk(build_dir):
-            for file in files:
-                if file.endswith(".exe"):
-                    exe_path = os.path.join(root, file)
-                    print(f"✅ Windows .exe built successfully: {exe_path}")
-                    return exe_path
-        
-        print("❌ Could not find built .exe file")
-        return None
-        
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to build Windows .exe: {e}")
-        return None
 
-def build_android_apk():
-    """Build Android .apk file"""
-    print("📱 Building Android .apk...")
-    
-    try:
-        # Install buildozer if not present
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "buildozer"])
-        
-        # Create buildozer.spec
-        create_buildozer_spec()
-        
-        # Build the APK
-        subprocess.check_call(["buildozer", "android", "debug"])
-        
-        # Find the built apk
-        bin_dir = "bin"
-        if os.path.exists(bin_dir):
-            for file in os.listdir(bin_dir):
-                if file.endswith(".apk"):
-                    apk_path = os.path.join(bin_dir, file)
-                    print(f"✅ Android .apk built successfully: {apk_path}")
-                    return apk_path
-        
-        print("❌ Could not find built .apk file")
-        return None
-        
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to build Android .apk: {e}")
-        print("Note: Android building requires additional setup (Android SDK, NDK)")
-        return None
-
-def create_download_ready_files():
-    """Create download-ready files with instructions"""
-    
-    # Create Windows download package
-    windows_content = '''
+WINDOWS_README = '''
 🚀 COSMIC DEFENDER - Windows Version
 Created by AndreyVV
 
@@ -180,12 +117,8 @@ Defend the galaxy from alien invaders! Collect power-ups, upgrade your ship, and
 
 Created with ❤️ by AndreyVV
 '''
-    
-    with open("CosmicDefender_Windows_README.txt", "w") as f:
-        f.write(windows_content)
-    
-    # Create Android download package
-    android_content = '''
+
+ANDROID_README = '''
 🚀 COSMIC DEFENDER - Android Version
 Created by AndreyVV
 
@@ -215,56 +148,238 @@ Defend the galaxy from alien invaders! Collect power-ups, upgrade your ship, and
 
 Created with ❤️ by AndreyVV
 '''
-    
-    with open("CosmicDefender_Android_README.txt", "w") as f:
-        f.write(android_content)
-    
-    print("✅ Created download-ready documentation")
+
+PACKAGE_FILES = {
+    "CosmicDefender_Windows_README.txt": WINDOWS_README,
+    "CosmicDefender_Android_README.txt": ANDROID_README,
+}
+
+class StageFailed(Exception):
+    """A build stage could not produce its artifact"""
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def inputs_digest(paths=(), **extra):
+    """One hash over file contents plus any other values the stage depends on"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode() + b"\0" + file_digest(path).encode() + b"\0")
+    digest.update(json.dumps(extra, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def installed_version(package):
+    from importlib import metadata
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+def write_if_changed(path, content):
+    """Write a generated file only when its content differs, keeping its mtime stable"""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return True
+
+def find_file(root, name=None, suffix=None):
+    for directory, _, files in os.walk(root):
+        for file in sorted(files):
+            if file == name or (suffix and file.endswith(suffix)):
+                return os.path.join(directory, file)
+    return None
+
+class Builder:
+    """Runs build stages in order, skipping those whose input hash is unchanged"""
+
+    def __init__(self, force=False, install=False):
+        self.force = force
+        self.install = install
+        self.state = {}
+        if os.path.exists(STATE_PATH):
+            with open(STATE_PATH) as f:
+                self.state = json.load(f)
+        self.results = []
+
+    def save_state(self):
+        os.makedirs(BUILD_DIR, exist_ok=True)
+        with open(STATE_PATH, "w") as f:
+            json.dump(self.state, f, indent=2)
+
+    def run(self, stage, key, build, outputs=()):
+        """Run build() unless key matches the last success and the artifact still exists.
+
+        outputs lists any other files the stage writes, which must also still
+        exist. A key of None means the stage is cheap enough to run every time.
+        """
+        start = time.perf_counter()
+        previous = self.state.get(stage, {})
+        if (not self.force and key is not None and previous.get('key') == key
+                and (previous.get('artifact') is None or os.path.exists(previous['artifact']))
+                and all(os.path.exists(path) for path in outputs)):
+            status, artifact = 'up to date', previous.get('artifact')
+        else:
+            print(f"🔨 {stage}...")
+            try:
+                artifact = build()
+            except (StageFailed, subprocess.CalledProcessError, OSError) as e:
+                status, artifact = 'failed', None
+                print(f"❌ {stage} failed: {e}")
+            else:
+                status = 'built' if key is not None else 'checked'
+                if key is not None:
+                    self.state[stage] = {'key': key, 'artifact': artifact}
+                    self.save_state()
+
+        elapsed = time.perf_counter() - start
+        result = {'stage': stage, 'status': status, 'seconds': elapsed, 'artifact': artifact}
+        if artifact and os.path.exists(artifact):
+            result['artifact_bytes'] = os.path.getsize(artifact)
+            result['artifact_age_s'] = time.time() - os.path.getmtime(artifact)
+        self.results.append(result)
+        mark = {'built': "✅", 'checked': "✅", 'up to date': "⏭️ ", 'failed': "❌"}[status]
+        print(f"{mark} {stage}: {status} in {elapsed:.2f}s" + (f" -> {artifact}" if artifact else ""))
+        return status != 'failed'
+
+    def requirements(self):
+        """Check the pinned packages offline; install mismatches only with --install"""
+        def build():
+            versions = {package: installed_version(package) for package in PINNED_PACKAGES}
+            wrong = [package for package, pin in PINNED_PACKAGES.items()
+                     if versions[package] is None or (pin and versions[package] != pin)]
+            for package in wrong:
+                print(f"   {package}: installed {versions[package] or 'none'}, "
+                      f"pinned {PINNED_PACKAGES[package] or 'any'}")
+            if wrong and self.install:
+                specs = [f"{package}=={PINNED_PACKAGES[package]}" if PINNED_PACKAGES[package] else package
+                         for package in wrong]
+                subprocess.check_call([sys.executable, "-m", "pip", "install"] + specs)
+            elif wrong:
+                # Not fatal: a stage that really needs a package fails on its own
+                print("⚠️  Pins not satisfied; rerun with --install to fix them")
+            return None
+
+        return self.run('requirements', None, build)
+
+    def compile(self):
+        """Byte-compile the game once, optimized, into a hash-checked .pyc"""
+        def build():
+            try:
+                return py_compile.compile(GAME_SOURCE, optimize=2, doraise=True,
+                                          invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+            except py_compile.PyCompileError as e:
+                raise StageFailed(e.msg)
+
+        return self.run('compile', inputs_digest([GAME_SOURCE], python=sys.version), build)
+
+    def exe(self):
+        """Freeze the game with cx_Freeze"""
+        write_if_changed("setup.py", SETUP_PY)
+        versions = {package: installed_version(package) for package in ('pygame', 'numpy', 'cx-Freeze')}
+
+        def build():
+            if versions['cx-Freeze'] is None:
+                raise StageFailed("cx_Freeze is not installed (rerun with --install)")
+            subprocess.check_call([sys.executable, "setup.py", "build"])
+            artifact = find_file(BUILD_DIR, name=TARGET_NAME)
+            if artifact is None:
+                raise StageFailed(f"no {TARGET_NAME} under {BUILD_DIR}")
+            return artifact
+
+        key = inputs_digest([GAME_SOURCE, "setup.py"], python=sys.version,
+                            platform=platform.platform(), versions=versions)
+        return self.run('exe', key, build)
+
+    def apk(self):
+        """Package the game for Android with buildozer"""
+        write_if_changed("buildozer.spec", BUILDOZER_SPEC)
+
+        def build():
+            if installed_version('buildozer') is None:
+                if not self.install:
+                    raise StageFailed("buildozer is not installed (rerun with --install)")
+                subprocess.check_call([sys.executable, "-m", "pip", "install", "buildozer"])
+            try:
+                subprocess.check_call(["buildozer", "android", "debug"])
+            except subprocess.CalledProcessError as e:
+                raise StageFailed(f"{e} (Android building requires the Android SDK and NDK)")
+            artifact = find_file(APK_DIR, suffix=".apk")
+            if artifact is None:
+                raise StageFailed(f"no .apk under {APK_DIR}")
+            return artifact
+
+        key = inputs_digest([GAME_SOURCE, "buildozer.spec"], buildozer=installed_version('buildozer'))
+        return self.run('apk', key, build)
+
+    def packages(self):
+        """Write the download-ready documentation"""
+        def build():
+            for path, content in PACKAGE_FILES.items():
+                write_if_changed(path, content)
+            return None
+
+        return self.run('packages', inputs_digest(files=PACKAGE_FILES), build, outputs=PACKAGE_FILES)
 
 def main():
-    """Main build function"""
+    parser = argparse.ArgumentParser(description="Cosmic Defender build tool")
+    parser.add_argument('--target', choices=TARGETS, action='append',
+                        help=f"stage to run (repeatable, default: {' '.join(DEFAULT_TARGETS)})")
+    parser.add_argument('--force', action='store_true', help="rerun stages even when their inputs are unchanged")
+    parser.add_argument('--install', action='store_true',
+                        help="pip install missing or mismatched pinned packages (needs network)")
+    parser.add_argument('--output', metavar='PATH', help="write stage and artifact timings as JSON")
+    args = parser.parse_args()
+
+    # Every path is relative to the source tree, wherever the tool is started from
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
     print("🚀 COSMIC DEFENDER - Automatic Build System")
     print("Created by AndreyVV")
     print("=" * 50)
-    
-    # Check if source file exists
-    if not os.path.exists("cosmic_defender_game.py"):
-        print("❌ cosmic_defender_game.py not found!")
+
+    if not os.path.exists(GAME_SOURCE):
+        print(f"❌ {GAME_SOURCE} not found!")
         print("Please make sure the game source file is in the same directory.")
-        return
-    
-    print("📋 Build Options:")
-    print("1. Install requirements only")
-    print("2. Build Windows .exe")
-    print("3. Build Android .apk")
-    print("4. Build both .exe and .apk")
-    print("5. Create download packages")
-    
-    choice = input("\nEnter your choice (1-5): ").strip()
-    
-    if choice == "1":
-        install_requirements()
-    elif choice == "2":
-        install_requirements()
-        build_windows_exe()
-    elif choice == "3":
-        install_requirements()
-        build_android_apk()
-    elif choice == "4":
-        install_requirements()
-        build_windows_exe()
-        build_android_apk()
-    elif choice == "5":
-        create_download_ready_files()
-    else:
-        print("❌ Invalid choice!")
-        return
-    
+        return 1
+
+    start = time.perf_counter()
+    builder = Builder(force=args.force, install=args.install)
+    targets = args.target or DEFAULT_TARGETS
+    ok = True
+    for target in TARGETS:
+        if target in targets:
+            ok = getattr(builder, target)() and ok
+    elapsed = time.perf_counter() - start
+
+    print("\n⏱️  Build timings")
+    for result in builder.results:
+        size = f"{result['artifact_bytes'] / 1024:>10.0f} KB" if 'artifact_bytes' in result else ""
+        print(f"   {result['stage']:<14}{result['status']:<12}{result['seconds']:>8.2f}s{size}")
+    print(f"   {'total':<26}{elapsed:>8.2f}s")
+
+    if args.output:
+        report = {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'seconds': elapsed,
+            'stages': builder.results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Wrote {args.output}")
+
+    if not ok:
+        print("\n❌ Build finished with failed stages")
+        return 1
     print("\n🎉 Build process completed!")
-    print("Check the generated files in the current directory.")
-    print("\nFor manual building:")
-    print("Windows: python setup.py build")
-    print("Android: buildozer android debug")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+🚀 COSMIC DEFENDER - Batch Simulation Runner
+Created by AndreyVV
+
+Plays thousands of headless games across all CPU cores for difficulty
+balance sweeps. Every game gets its own seed, a built-in pilot and one
+combination of the swept difficulty parameters; results are aggregated
+into survival time, score and level distributions per parameter set.
+
+Usage:
+    python batch_sim.py --games 500
+    python batch_sim.py --games 200 --param spawn_interval_min=10,15,20 --output sweep.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Workers run headless games only; keep pygame quiet on import
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from osmic_defender_game import CosmicDefender, PILOTS, DEFAULT_DIFFICULTY, SIM_HZ
+
+# Every built-in pilot except the keyboard can fly a headless game
+HEADLESS_PILOTS = sorted(name for name in PILOTS if name != 'keyboard')
+
+def play_game(job):
+    """Run one headless game to game over (or max_ticks) and return its outcome"""
+    seed, params, pilot, max_ticks = job
+    game = CosmicDefender(headless=True, input_source=PILOTS[pilot](),
+                          seed=seed, difficulty=params)
+    report = game.run_headless(max_ticks, restart_on_game_over=False)
+    return {
+        'seed': seed,
+        'params': params,
+        'survival_ticks': report['ticks'],
+        'survived': report['game_state'] != "GAME_OVER",
+        'score': report['score'],
+        'level': report['level'],
+    }
+
+def parse_param(text):
+    name, _, values = text.partition("=")
+    if name not in DEFAULT_DIFFICULTY or not values:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=V1,V2,... with NAME one of {', '.join(DEFAULT_DIFFICULTY)}")
+    kind = type(DEFAULT_DIFFICULTY[name])
+    return name, [kind(value) for value in values.split(",")]
+
+def param_grid(sweeps):
+    names = [name for name, _ in sweeps]
+    for values in itertools.product(*(values for _, values in sweeps)):
+        yield dict(zip(names, values))
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def distribution(values):
+    ordered = sorted(values)
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p10': percentile(ordered, 0.10),
+        'p50': percentile(ordered, 0.50),
+        'p90': percentile(ordered, 0.90),
+        'max': ordered[-1],
+    }
+
+def aggregate(results):
+    groups = {}
+    for result in results:
+        key = json.dumps(result['params'], sort_keys=True)
+        groups.setdefault(key, []).append(result)
+
+    report = []
+    for key, games in groups.items():
+        report.append({
+            'params': json.loads(key),
+            'games': len(games),
+            'survived_max_ticks': sum(game['survived'] for game in games),
+            'survival_seconds': distribution([game['survival_ticks'] / SIM_HZ for game in games]),
+            'score': distribution([game['score'] for game in games]),
+            'levels': dict(sorted(Counter(game['level'] for game in games).items())),
+        })
+    return report
+
+def print_report(report):
+    for group in report:
+        params = ", ".join(f"{name}={value}" for name, value in group['params'].items()) or "defaults"
+        survival = group['survival_seconds']
+        score = group['score']
+        print(f"\n🎯 {params} ({group['games']} games, {group['survived_max_ticks']} reached the tick limit)")
+        print(f"   survival s: mean {survival['mean']:.1f}  p10 {survival['p10']:.1f}  "
+              f"p50 {survival['p50']:.1f}  p90 {survival['p90']:.1f}")
+        print(f"   score:      mean {score['mean']:.0f}  p50 {score['p50']}  max {score['max']}")
+        print("   levels:     " + "  ".join(f"L{level}: {count}" for level, count in group['levels'].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosmic Defender batch balance simulator")
+    parser.add_argument('--games', type=int, default=1000, help="games per parameter set")
+    parser.add_argument('--param', type=parse_param, action='append', default=[],
+                        help="difficulty parameter to sweep, NAME=V1,V2,... (repeatable)")
+    parser.add_argument('--pilot', choices=HEADLESS_PILOTS, default='chase', help="built-in pilot")
+    parser.add_argument('--max-ticks', type=int, default=SIM_HZ * 60 * 10,
+                        help="tick limit per game (default: 10 minutes)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--output', metavar='PATH', help="write the aggregated report as JSON")
+    args = parser.parse_args()
+
+    jobs = [(args.seed + i, params, args.pilot, args.max_ticks)
+            for params in param_grid(args.param)
+            for i in range(args.games)]
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"🚀 Running {len(jobs)} games on {workers} workers...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(play_game, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+    elapsed = time.perf_counter() - start
+
+    report = aggregate(results)
+    print_report(report)
+    total_ticks = sum(result['survival_ticks'] for result in results)
+    print(f"\n✅ {len(jobs)} games, {total_ticks} ticks in {elapsed:.1f}s "
+          f"({total_ticks / elapsed:.0f} ticks/s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'pilot': args.pilot, 'max_ticks': args.max_ticks, 'groups': report}, f, indent=2)
+        print(f"✅ Wrote {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+🚀 COSMIC DEFENDER - Benchmark Suite
+Created by AndreyVV
+
+Runs the update and draw hot paths against fixed, seeded scenarios and
+reports per-stage mean/p95/p99 times and ticks per second.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --scenario swarm15 --ticks 1200 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+# Draw into an offscreen surface unless a real display was requested
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import numpy as np
+import osmic_defender_game as game_module
+from osmic_defender_game import (CosmicDefender, ScriptedInput, EntityTable, Enemy, Player,
+                                 ENEMY_TYPES, ORANGE, RED, load_snapshot)
+
+STAGES = [
+    'update',
+    'update_player',
+    'update_bullets',
+    'update_enemies',
+    'update_particles',
+    'update_power_ups',
+    'update_explosions',
+    'update_stars',
+    'spawn_enemies',
+    'spawn_power_ups',
+    'check_collisions',
+    'draw',
+    'draw_menu',
+    'draw_game',
+    'draw_ui',
+]
+
+SWARM_SIZE = 60
+ENTITY_COUNTS = ('enemies', 'bullets', 'particles')
+
+def setup_menu(game):
+    game.game_state = "MENU"
+
+def setup_level1(game):
+    game.start_game()
+
+def fill_swarm(game):
+    """Spawn level-appropriate enemies until SWARM_SIZE are on screen"""
+    while len(game.enemies) < SWARM_SIZE:
+        game.enemy_spawn_timer = 1000
+        game.spawn_enemies()
+
+def setup_swarm15(game):
+    game.start_game()
+    game.level = 15
+    game.score = 14 * 2000
+    fill_swarm(game)
+    for enemy in game.enemies:
+        enemy.y = game.rng.uniform(0, game_module.SCREEN_HEIGHT / 2)
+
+def setup_particle_storm(game):
+    game.start_game()
+
+def keep_alive(game):
+    # Scenarios measure steady-state load, so the player never dies
+    game.health = game.max_health
+    game.lives = 3
+
+def swarm(game):
+    # Enemies leaving the screen or shot down are replaced, so the swarm holds
+    keep_alive(game)
+    fill_swarm(game)
+
+def storm(game):
+    keep_alive(game)
+    for i in range(40):
+        x = 100 + (i * 97) % (game_module.SCREEN_WIDTH - 200)
+        game.create_particle(x, 200 + (i * 53) % 300, ORANGE if i % 2 else RED, (2, 5), 25)
+
+SCENARIOS = {
+    'menu': (setup_menu, None),
+    'level1': (setup_level1, keep_alive),
+    'swarm15': (setup_swarm15, swarm),
+    'particle_storm': (setup_particle_storm, storm),
+}
+
+def snapshot_scenario(path):
+    """Scenario that starts from a saved session instead of simulating up to it"""
+    def setup(game):
+        load_snapshot(game, path)
+        # Quick-saves are often taken while paused
+        game.resume()
+    return (setup, keep_alive)
+
+def instrument(game, samples):
+    """Shadow each stage method on the instance with a timing wrapper"""
+    for name in STAGES:
+        original = getattr(game, name)
+        samples[name] = []
+
+        def timed(*args, _original=original, _bucket=samples[name]):
+            start = time.perf_counter()
+            result = _original(*args)
+            _bucket.append(time.perf_counter() - start)
+            return result
+
+        setattr(game, name, timed)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(values):
+    ordered = sorted(values)
+    count = len(ordered)
+    return {
+        'calls': count,
+        'mean_ms': sum(ordered) / count * 1000 if count else 0.0,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'max_ms': ordered[-1] * 1000 if count else 0.0,
+    }
+
+def run_scenario(scenario, ticks, warmup, seed):
+    setup, per_tick = scenario
+    game = CosmicDefender(input_source=ScriptedInput(), seed=seed)
+    setup(game)
+
+    for _ in range(warmup):
+        if per_tick:
+            per_tick(game)
+        game.update()
+        game.draw()
+
+    samples = {}
+    instrument(game, samples)
+    frame_times = []
+    entity_totals = dict.fromkeys(ENTITY_COUNTS, 0)
+    for _ in range(ticks):
+        if per_tick:
+            per_tick(game)
+        start = time.perf_counter()
+        game.update()
+        game.draw()
+        frame_times.append(time.perf_counter() - start)
+        for name in ENTITY_COUNTS:
+            entity_totals[name] += len(getattr(game, name))
+
+    total = sum(frame_times)
+    return {
+        'ticks': ticks,
+        'ticks_per_second': ticks / total if total > 0 else float('inf'),
+        'frame': summarize(frame_times),
+        'stages': {stage: summarize(values) for stage, values in samples.items() if values},
+        # Mean live counts over the measured ticks, so a scenario that drains shows up
+        'entities': {name: total / ticks for name, total in entity_totals.items()},
+        'pools': game.pool_stats()
+    }
+
+def print_report(name, result):
+    print(f"\n📊 {name}: {result['ticks_per_second']:.0f} ticks/s "
+          f"(frame mean {result['frame']['mean_ms']:.3f} ms, p99 {result['frame']['p99_ms']:.3f} ms)")
+    print("   mean entities: " + "  ".join(f"{name} {count:.1f}" for name, count in result['entities'].items()))
+    print(f"   {'stage':<20}{'mean ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result['stages'].items():
+        print(f"   {stage:<20}{stats['mean_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+def make_dict_enemy(i):
+    # The pre-__slots__ entity layout, kept here only for comparison
+    return {'x': (i * 37) % 980, 'y': (i * 53) % 700, 'width': 40, 'height': 30,
+            'speed': 2.5, 'health': 60, 'max_health': 60, 'type': 'zigzag' if i % 4 == 0 else 'basic',
+            'direction': 1, 'shoot_timer': 90}
+
+class SlotsEnemy:
+    # The pre-table __slots__ entity layout, kept here only for comparison
+    __slots__ = ('x', 'y', 'width', 'height', 'speed', 'health', 'max_health',
+                 'type', 'direction', 'shoot_timer')
+    
+    def __init__(self, x, y, width, height, speed, health, max_health, type, direction, shoot_timer):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.health = health
+        self.max_health = max_health
+        self.type = type
+        self.direction = direction
+        self.shoot_timer = shoot_timer
+
+def make_slots_enemy(i):
+    return SlotsEnemy((i * 37) % 980, (i * 53) % 700, 40, 30, 2.5, 60, 60,
+                      'zigzag' if i % 4 == 0 else 'basic', 1, 90)
+
+def make_table_enemies(count):
+    table = EntityTable('enemies', Enemy, count)
+    for i in range(count):
+        table.acquire(x=(i * 37) % 980, y=(i * 53) % 700, width=40, height=30, speed=2.5,
+                      health=60, max_health=60, type='zigzag' if i % 4 == 0 else 'basic',
+                      direction=1, shoot_timer=90)
+    return table
+
+def make_entities(factory, count):
+    if factory is make_table_enemies:
+        return factory(count)
+    return [factory(i) for i in range(count)]
+
+def measure_memory(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    entities = make_entities(factory, count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del entities
+    return total / count
+
+def tick_dicts(enemies, player):
+    hits = 0
+    for enemy in enemies:
+        if enemy['type'] == 'zigzag':
+            enemy['x'] += enemy['direction'] * 3
+            if enemy['x'] <= 0 or enemy['x'] >= 1024 - enemy['width']:
+                enemy['direction'] *= -1
+        enemy['y'] += enemy['speed']
+        if enemy['y'] > 768:
+            enemy['y'] = -40
+        enemy['shoot_timer'] -= 1
+        if (player['x'] < enemy['x'] + enemy['width'] and player['x'] + player['width'] > enemy['x'] and
+                player['y'] < enemy['y'] + enemy['height'] and player['y'] + player['height'] > enemy['y']):
+            hits += 1
+    return hits
+
+def tick_slots(enemies, player):
+    hits = 0
+    for enemy in enemies:
+        if enemy.type == 'zigzag':
+            enemy.x += enemy.direction * 3
+            if enemy.x <= 0 or enemy.x >= 1024 - enemy.width:
+                enemy.direction *= -1
+        enemy.y += enemy.speed
+        if enemy.y > 768:
+            enemy.y = -40
+        enemy.shoot_timer -= 1
+        if (player.x < enemy.x + enemy.width and player.x + player.width > enemy.x and
+                player.y < enemy.y + enemy.height and player.y + player.height > enemy.y):
+            hits += 1
+    return hits
+
+def tick_table(enemies, player):
+    x = enemies.live('x')
+    y = enemies.live('y')
+    direction = enemies.live('direction')
+    zigzag = enemies.live('type') == ENEMY_TYPES.index('zigzag')
+    x += np.where(zigzag, direction * 3, 0)
+    direction[zigzag & ((x <= 0) | (x >= 1024 - enemies.live('width')))] *= -1
+    y += enemies.live('speed')
+    y[y > 768] = -40
+    enemies.live('shoot_timer')[:] -= 1
+    hits = ((player.x < x + enemies.live('width')) & (player.x + player.width > x) &
+            (player.y < y + enemies.live('height')) & (player.y + player.height > y))
+    return int(hits.sum())
+
+def compare_entity_models(count, ticks):
+    """Per-entity memory and per-tick CPU of dict, __slots__ and NumPy table entities"""
+    results = {}
+    models = {
+        'dict': (make_dict_enemy, tick_dicts,
+                 {'x': 480, 'y': 668, 'width': 60, 'height': 40, 'speed': 8}),
+        'slots': (make_slots_enemy, tick_slots, Player(480, 668)),
+        'table': (make_table_enemies, tick_table, Player(480, 668)),
+    }
+    for name, (factory, tick, player) in models.items():
+        bytes_per_entity = measure_memory(factory, count)
+        enemies = make_entities(factory, count)
+        samples = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            tick(enemies, player)
+            samples.append(time.perf_counter() - start)
+        results[name] = {'bytes_per_entity': bytes_per_entity, 'tick': summarize(samples)}
+
+    print(f"\n📊 entity model: {count} enemies x {ticks} ticks")
+    print(f"   {'model':<10}{'bytes/entity':>14}{'mean ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"   {name:<10}{result['bytes_per_entity']:>14.0f}"
+              f"{result['tick']['mean_ms']:>10.3f}{result['tick']['p99_ms']:>10.3f}")
+    memory_saving = 1 - results['slots']['bytes_per_entity'] / results['dict']['bytes_per_entity']
+    cpu_saving = 1 - results['slots']['tick']['mean_ms'] / results['dict']['tick']['mean_ms']
+    print(f"   slots vs dict: {memory_saving:.0%} less memory, {cpu_saving:.0%} less CPU per tick")
+    memory_saving = 1 - results['table']['bytes_per_entity'] / results['slots']['bytes_per_entity']
+    cpu_saving = 1 - results['table']['tick']['mean_ms'] / results['slots']['tick']['mean_ms']
+    print(f"   table vs slots: {memory_saving:.0%} less memory, {cpu_saving:.0%} less CPU per tick")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosmic Defender benchmark suite")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument('--ticks', type=int, default=600, help="measured ticks per scenario")
+    parser.add_argument('--warmup', type=int, default=120, help="unmeasured ticks before sampling")
+    parser.add_argument('--seed', type=int, default=1234, help="seed for every scenario")
+    parser.add_argument('--output', metavar='PATH', help="write results as JSON")
+    parser.add_argument('--snapshot', metavar='PATH', action='append', default=[],
+                        help="also run a scenario starting from a saved session snapshot (repeatable)")
+    parser.add_argument('--compare-entities', type=int, metavar='COUNT', default=0,
+                        help="also compare dict, __slots__ and table entities at COUNT enemies")
+    args = parser.parse_args()
+
+    scenarios = {name: SCENARIOS[name] for name in args.scenario or list(SCENARIOS)}
+    for path in args.snapshot:
+        scenarios[f"snapshot:{path}"] = snapshot_scenario(path)
+    
+    results = {}
+    for name, scenario in scenarios.items():
+        results[name] = run_scenario(scenario, args.ticks, args.warmup, args.seed)
+        print_report(name, results[name])
+
+    entity_models = None
+    if args.compare_entities:
+        entity_models = compare_entity_models(args.compare_entities, args.ticks)
+
+    if args.output:
+        report = {
+            'python': sys.version.split()[0],
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'scenarios': results,
+        }
+        if entity_models:
+            report['entity_models'] = entity_models
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Wrote {args.output}")
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
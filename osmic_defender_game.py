@@ -8,7 +8,8 @@ Professional 2D Space Shooter with Advanced Features
 To run this game:
 1. Install Python 3.8+
 2. Install pygame: pip install pygame
-3. Run: python cosmic_defender_game.py
+3. Install numpy: pip install numpy
+4. Run: python osmic_defender_game.py
 
 To build executable:
 Windows: pip install cx-freeze && python setup.py build
@@ -16,18 +17,77 @@ Android: pip install buildozer && buildozer android debug
 """
 
 import pygame
+import numpy as np
 import random
 import math
 import sys
-
-# Initialize Pygame
-pygame.init()
+import time
+import struct
+import zlib
+import json
+import threading
+from operator import attrgetter
+from itertools import repeat
+from collections import namedtuple, deque, OrderedDict
 
 # Game Constants
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
 FPS = 60
 
+# Fixed-timestep simulation: speeds and timers are per simulation tick
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ
+MAX_STEPS_PER_FRAME = 5
+MAX_FRAME_TIME = 0.25
+# Seeds are stored as unsigned 64-bit values in replay and snapshot headers
+MAX_SEED = 2 ** 64 - 1
+RENDER_MODES = ('capped', 'uncapped', 'vsync')
+RENDER_PATHS = ('full', 'dirty')
+DIRTY_RECT_LIMIT = 2000  # beyond this many rects a full flip is cheaper
+
+# Difficulty tuning: spawn interval max(interval - level*step, min) ticks,
+# enemy health base + level*step, enemy speed bonus level*step
+DEFAULT_DIFFICULTY = {
+    'spawn_interval': 30,
+    'spawn_interval_step': 2,
+    'spawn_interval_min': 15,
+    'enemy_health': 50,
+    'enemy_health_step': 10,
+    'enemy_speed_step': 0.3,
+}
+
+# Visual quality levels, best first, stepped through by the QualityGovernor
+QUALITY_LEVELS = (
+    {'name': 'high', 'particles': 1.0, 'explosion_rings': True, 'stars': 1.0, 'health_bars': True},
+    {'name': 'medium', 'particles': 0.6, 'explosion_rings': True, 'stars': 0.75, 'health_bars': True},
+    {'name': 'low', 'particles': 0.3, 'explosion_rings': False, 'stars': 0.5, 'health_bars': True},
+    {'name': 'minimal', 'particles': 0.1, 'explosion_rings': False, 'stars': 0.25, 'health_bars': False},
+)
+MAX_PARTICLES = 65536
+STAR_COUNT = 200
+STAR_LAYERS = 3
+PARTICLE_GRAVITY = 0.2
+COLLISION_CELL_SIZE = 64
+TEXT_CACHE_SIZE = 256
+PULSE_FRAMES = 16
+PARTICLE_FADE_LEVELS = 8
+
+# Startup: fonts load on first use; sprites and static text are warmed in
+# slices of at most WARMUP_BUDGET seconds per frame while the menu is shown
+FONT_SIZES = {'large': 72, 'medium': 36, 'small': 24}
+WARMUP_BUDGET = 0.004
+
+# Entity pool capacities
+MAX_BULLETS = 4096
+MAX_ENEMIES = 1024
+MAX_POWER_UPS = 64
+MAX_EXPLOSIONS = 512
+
+# Below this many live rows a per-call NumPy overhead outweighs the loop it
+# replaces, so bullets and enemies step in plain Python over column lists
+VECTORIZE_MIN_ROWS = 32
+
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -38,15 +98,1829 @@ YELLOW = (255, 255, 0)
 CYAN = (0, 255, 255)
 MAGENTA = (255, 0, 255)
 ORANGE = (255, 165, 0)
+PURPLE = (128, 0, 128)
+
+ENEMY_COLORS = {'basic': RED, 'fast': ORANGE, 'tank': PURPLE, 'zigzag': MAGENTA}
+POWER_UP_COLORS = {'health': GREEN, 'score': YELLOW, 'weapon': CYAN, 'shield': BLUE}
+
+class BackgroundLayer:
+    """Vertical gradient background, pre-rendered once into a cached Surface"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cached = True  # False = legacy per-scanline path (for comparison)
+        self.surface = None
+
+    def gradient_color(self, y):
+        color_intensity = int(20 * (1 - y / self.height))
+        return (color_intensity, color_intensity // 2, color_intensity * 2)
+
+    def build(self):
+        self.surface = pygame.Surface((self.width, self.height))
+        for y in range(self.height):
+            pygame.draw.line(self.surface, self.gradient_color(y), (0, y), (self.width, y))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+
+    def restore(self, target, rects):
+        """Repaint the background under rects, erasing whatever was drawn there"""
+        if self.surface is None:
+            self.build()
+        target.blits([(self.surface, rect, rect) for rect in rects], False)
+    
+    def draw(self, target):
+        if not self.cached:
+            for y in range(self.height):
+                pygame.draw.line(target, self.gradient_color(y), (0, y), (self.width, y))
+            return
+        
+        if self.surface is None:
+            self.build()
+        target.blit(self.surface, (0, 0))
+
+class ParticleSystem:
+    """Struct-of-arrays particle engine backed by preallocated NumPy arrays"""
+
+    def __init__(self, capacity=MAX_PARTICLES, rng=None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.decay = np.zeros(capacity, dtype=np.float32)
+        self.color_index = np.zeros(capacity, dtype=np.uint8)
+        self.size = np.zeros(capacity, dtype=np.uint8)
+        
+        # Palette of particle colors, indexed by color_index
+        self.palette = []
+        self.palette_lookup = {}
+    
+    def __len__(self):
+        return self.count
+    
+    def clear(self):
+        self.count = 0
+    
+    def color_id(self, color):
+        index = self.palette_lookup.get(color)
+        if index is None:
+            index = len(self.palette)
+            self.palette.append(color)
+            self.palette_lookup[color] = index
+        return index
+    
+    def emit(self, x, y, color, size, count=1):
+        """Spawn count particles at (x, y); size is an int or an inclusive (min, max) range"""
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        
+        start, end = self.count, self.count + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = self.rng.uniform(-5, 5, count)
+        self.vy[start:end] = self.rng.uniform(-5, 5, count)
+        self.life[start:end] = 1.0
+        self.decay[start:end] = self.rng.uniform(0.02, 0.05, count)
+        self.color_index[start:end] = self.color_id(color)
+        if isinstance(size, tuple):
+            self.size[start:end] = self.rng.integers(size[0], size[1] + 1, count)
+        else:
+            self.size[start:end] = size
+        self.count = end
+    
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        
+        x, y = self.x[:n], self.y[:n]
+        vx, vy = self.vx[:n], self.vy[:n]
+        life = self.life[:n]
+        x += vx
+        y += vy
+        life -= self.decay[:n]
+        vy += PARTICLE_GRAVITY
+        
+        # Compact live particles to the front of the arrays
+        alive = life > 0
+        live_count = int(np.count_nonzero(alive))
+        if live_count < n:
+            for array in (self.x, self.y, self.vx, self.vy, self.life,
+                          self.decay, self.color_index, self.size):
+                array[:live_count] = array[:n][alive]
+            self.count = live_count
+    
+    def snapshot(self):
+        """Copy of the live particles that draws like this system and never changes"""
+        n = self.count
+        copy = object.__new__(ParticleSystem)
+        copy.capacity = copy.count = n
+        copy.rng = None
+        for name in ('x', 'y', 'vx', 'vy', 'life', 'decay', 'color_index', 'size'):
+            setattr(copy, name, getattr(self, name)[:n].copy())
+        copy.palette = list(self.palette)
+        copy.palette_lookup = dict(self.palette_lookup)
+        return copy
+
+# Entity types: __slots__ keeps each instance compact and attribute access fast
+class Player:
+    __slots__ = ('x', 'y', 'width', 'height', 'speed')
+    
+    def __init__(self, x=0, y=0, width=60, height=40, speed=8):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.speed = speed
+
+class EntityRow:
+    """Attribute view of one EntityTable row.
+
+    Subclasses list their columns in FIELDS as (name, dtype, default);
+    fields named in CODES are stored as indices into a tuple of labels
+    and, like their defaults, are given as labels.
+    A row view stays valid until rows of its table are released.
+    """
+
+    __slots__ = ('table', 'index')
+    FIELDS = ()
+    CODES = {}
+    
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, _, _ in cls.FIELDS:
+            setattr(cls, name, column_property(name, cls.CODES.get(name)))
+
+def column_property(name, labels=None):
+    if labels is None:
+        def get_value(row):
+            return row.table.columns[name][row.index].item()
+        def set_value(row, value):
+            row.table.columns[name][row.index] = value
+    else:
+        def get_value(row):
+            return labels[row.table.columns[name][row.index]]
+        def set_value(row, value):
+            row.table.columns[name][row.index] = labels.index(value)
+    return property(get_value, set_value)
+
+ENEMY_TYPES = ('basic', 'fast', 'tank', 'zigzag')
+
+class Bullet(EntityRow):
+    __slots__ = ()
+    FIELDS = (('x', np.float64, 0), ('y', np.float64, 0), ('width', np.int32, 4),
+              ('height', np.int32, 15), ('speed', np.float64, 12), ('damage', np.int32, 25),
+              ('enemy', np.bool_, False))
+
+class Enemy(EntityRow):
+    __slots__ = ()
+    FIELDS = (('x', np.float64, 0), ('y', np.float64, 0), ('width', np.int32, 40),
+              ('height', np.int32, 30), ('speed', np.float64, 0.0), ('health', np.int32, 50),
+              ('max_health', np.int32, 50), ('type', np.int8, 'basic'), ('direction', np.int32, 1),
+              ('shoot_timer', np.int32, 0))
+    CODES = {'type': ENEMY_TYPES}
+
+class PowerUp:
+    __slots__ = ('x', 'y', 'width', 'height', 'speed', 'type', 'pulse')
+    
+    def __init__(self, x=0, y=0, width=25, height=25, speed=3, type='health', pulse=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.type = type
+        self.pulse = pulse
+
+class Explosion:
+    __slots__ = ('x', 'y', 'radius', 'max_radius', 'life', 'decay')
+    
+    def __init__(self, x=0, y=0, radius=5, max_radius=50, life=1.0, decay=0.05):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.max_radius = max_radius
+        self.life = life
+        self.decay = decay
+
+ENTITY_FIELDS = {cls: attrgetter(*cls.__slots__)
+                 for cls in (Player, PowerUp, Explosion)}
+
+def clone_entity(entity):
+    # Constructor arguments follow __slots__ order for every entity type
+    cls = type(entity)
+    return cls(*ENTITY_FIELDS[cls](entity))
+
+class GameSnapshot:
+    """Frozen copy of everything draw() reads, published by the simulation thread"""
+
+    __slots__ = ('game_state', 'score', 'level', 'lives', 'health', 'max_health',
+                 'player', 'player_prev', 'bullets', 'enemies', 'power_ups', 'explosions',
+                 'particles', 'stars', 'time')
+    
+    def __init__(self, game):
+        self.game_state = game.game_state
+        self.score = game.score
+        self.level = game.level
+        self.lives = game.lives
+        self.health = game.health
+        self.max_health = game.max_health
+        self.player = clone_entity(game.player)
+        self.player_prev = game.player_prev
+        self.bullets = game.bullets.snapshot()
+        self.enemies = game.enemies.snapshot()
+        self.power_ups = tuple(map(clone_entity, game.power_ups))
+        self.explosions = tuple(map(clone_entity, game.explosions))
+        self.particles = game.particles.snapshot()
+        self.stars = game.stars.snapshot()
+        self.time = time.perf_counter()
+
+class SimulationThread(threading.Thread):
+    """Advances the game on a fixed timestep and publishes a GameSnapshot per tick batch"""
+
+    def __init__(self, game):
+        super().__init__(name="simulation", daemon=True)
+        self.game = game
+        self.latest = None
+        self.error = None
+        self.stopping = threading.Event()
+    
+    def publish(self):
+        with self.game.state_lock:
+            # Reference assignment is atomic; readers always see a whole snapshot
+            self.latest = GameSnapshot(self.game)
+    
+    def run(self):
+        game = self.game
+        accumulator = 0.0
+        previous = time.perf_counter()
+        try:
+            self.publish()
+            while not self.stopping.is_set():
+                now = time.perf_counter()
+                accumulator += min(now - previous, MAX_FRAME_TIME)
+                previous = now
+                
+                steps = 0
+                while accumulator >= SIM_DT and steps < MAX_STEPS_PER_FRAME:
+                    with game.state_lock:
+                        game.update()
+                    accumulator -= SIM_DT
+                    steps += 1
+                if accumulator >= SIM_DT:
+                    accumulator %= SIM_DT
+                if steps:
+                    self.publish()
+                
+                self.stopping.wait(SIM_DT - accumulator)
+        except Exception as e:
+            self.error = e
+            game.running = False
+    
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+class EntityPool:
+    """Fixed-capacity pool of entity objects with a free list and O(1) swap-remove.
+
+    Iteration order is the active order; releasing an entity moves the last
+    active entity into its slot, so loops that remove while iterating should
+    re-visit the same index instead of advancing.
+    """
+
+    def __init__(self, name, factory, capacity):
+        self.name = name
+        self.factory = factory
+        self.capacity = capacity
+        self.active = []
+        self.free = []
+        self.allocated = 0
+        self.high_water = 0
+        self.dropped = 0
+    
+    def __len__(self):
+        return len(self.active)
+    
+    def __iter__(self):
+        return iter(self.active)
+    
+    def __getitem__(self, index):
+        return self.active[index]
+    
+    def acquire(self, **fields):
+        """Activate an entity with the given fields, or return None when the pool is full"""
+        active = self.active
+        if len(active) >= self.capacity:
+            self.dropped += 1
+            return None
+        
+        if self.free:
+            entity = self.free.pop()
+            entity.__init__(**fields)
+        else:
+            entity = self.factory(**fields)
+            self.allocated += 1
+        active.append(entity)
+        if len(active) > self.high_water:
+            self.high_water = len(active)
+        return entity
+    
+    def release(self, index):
+        active = self.active
+        entity = active[index]
+        last = active.pop()
+        if index < len(active):
+            active[index] = last
+        self.free.append(entity)
+    
+    def release_many(self, indices):
+        # Highest index first so swapped-in entities are never ones still to release
+        for index in sorted(indices, reverse=True):
+            self.release(index)
+    
+    def clear(self):
+        self.free.extend(self.active)
+        self.active.clear()
+    
+    def rects(self):
+        return ((entity.x, entity.y, entity.width, entity.height) for entity in self.active)
+    
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'active': len(self.active),
+            'high_water': self.high_water,
+            'allocated': self.allocated,
+            'dropped': self.dropped
+        }
+
+class EntityTable:
+    """Fixed-capacity entity store with one typed NumPy column per field.
+
+    Rows 0..len-1 are live, so whole-table updates are single array
+    operations on live(). Indexing and iteration yield row views with the
+    same attribute interface as EntityPool entities. release() swaps the
+    last row into the gap; release_many() compacts the survivors in order.
+    """
+
+    def __init__(self, name, row_class, capacity):
+        self.name = name
+        self.row_class = row_class
+        self.capacity = capacity
+        self.count = 0
+        self.high_water = 0
+        self.dropped = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype, _ in row_class.FIELDS}
+        self.defaults = {name: default for name, _, default in row_class.FIELDS}
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        row_class = self.row_class
+        return (row_class(self, index) for index in range(self.count))
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"{self.name} index out of range")
+        return self.row_class(self, index)
+    
+    def live(self, name):
+        """Writable view of a column over the live rows"""
+        return self.columns[name][:self.count]
+    
+    def encode(self, name, value):
+        labels = self.row_class.CODES.get(name)
+        return value if labels is None else labels.index(value)
+    
+    def acquire(self, **fields):
+        """Activate a row with the given fields, or return None when the table is full"""
+        index = self.count
+        if index >= self.capacity:
+            self.dropped += 1
+            return None
+        
+        for name, column in self.columns.items():
+            column[index] = self.encode(name, fields.get(name, self.defaults[name]))
+        self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return self.row_class(self, index)
+    
+    def acquire_many(self, count, **fields):
+        """Activate count rows at once; field values may be scalars or arrays of length count"""
+        start = self.count
+        stop = min(start + count, self.capacity)
+        self.dropped += count - (stop - start)
+        for name, column in self.columns.items():
+            value = fields.get(name, self.defaults[name])
+            if isinstance(value, np.ndarray):
+                value = value[:stop - start]
+            column[start:stop] = self.encode(name, value)
+        self.count = stop
+        if stop > self.high_water:
+            self.high_water = stop
+        return stop - start
+    
+    def release(self, index):
+        last = self.count - 1
+        if index < last:
+            for column in self.columns.values():
+                column[index] = column[last]
+        self.count = last
+    
+    def release_many(self, indices):
+        if len(indices) == 0:
+            return
+        keep = np.ones(self.count, dtype=bool)
+        keep[np.fromiter(indices, dtype=np.intp, count=len(indices))] = False
+        survivors = int(keep.sum())
+        for column in self.columns.values():
+            column[:survivors] = column[:self.count][keep]
+        self.count = survivors
+    
+    def clear(self):
+        self.count = 0
+    
+    def rects(self):
+        """(x, y, width, height) tuples of the live rows"""
+        n = self.count
+        columns = self.columns
+        return zip(columns['x'][:n].tolist(), columns['y'][:n].tolist(),
+                   columns['width'][:n].tolist(), columns['height'][:n].tolist())
+    
+    def snapshot(self):
+        """Copy of the live rows that reads like this table and never changes"""
+        copy = EntityTable(self.name, self.row_class, 0)
+        copy.capacity = copy.count = copy.high_water = self.count
+        copy.columns = {name: self.live(name).copy() for name in self.columns}
+        return copy
+    
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'active': self.count,
+            'high_water': self.high_water,
+            'allocated': self.high_water,
+            'dropped': self.dropped
+        }
+
+class StarField:
+    """Parallax star field backed by NumPy arrays.
+
+    Stars are split evenly into layers; nearer layers scroll faster and
+    shine brighter, so across layers speed and brightness keep the
+    original uniform spread.
+    """
+
+    def __init__(self, width, height, count=STAR_COUNT, layers=STAR_LAYERS, rng=None):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.count = count
+        self.layers = layers
+        
+        layer = np.arange(count) % layers
+        low, high = layer / layers, (layer + 1) / layers
+        self.layer = layer.astype(np.uint8)
+        self.x = self.rng.integers(0, width + 1, count).astype(np.float32)
+        self.y = self.rng.integers(0, height + 1, count).astype(np.float32)
+        self.speed = (0.5 + 2.5 * self.rng.uniform(low, high)).astype(np.float32)
+        self.brightness = (100 + 155 * self.rng.uniform(low, high)).astype(np.uint8)
+    
+    def __len__(self):
+        return self.count
+    
+    def update(self):
+        self.y += self.speed
+        
+        # Wrap stars that left the bottom back to the top at a new column
+        wrapped = self.y > self.height
+        wrapped_count = int(np.count_nonzero(wrapped))
+        if wrapped_count:
+            self.y[wrapped] = -5
+            self.x[wrapped] = self.rng.integers(0, self.width + 1, wrapped_count)
+    
+    def snapshot(self):
+        copy = object.__new__(StarField)
+        copy.__dict__.update(self.__dict__)
+        copy.x = self.x.copy()
+        copy.y = self.y.copy()
+        copy.rng = None
+        return copy
+    
+    def draw(self, target, lag=0.0, fraction=1.0, rects=None):
+        # Layers are interleaved, so any prefix of the arrays keeps every layer
+        n = self.count if fraction >= 1.0 else int(self.count * fraction)
+        xs = self.x[:n]
+        ys = self.y[:n] - self.speed[:n] * lag if lag else self.y[:n]
+        if target.get_bytesize() != 4:
+            for x, y, brightness in zip(xs.astype(np.int32).tolist(),
+                                        ys.astype(np.int32).tolist(),
+                                        self.brightness[:n].tolist()):
+                rect = pygame.draw.circle(target, (brightness, brightness, brightness), (x, y), 1)
+                if rects is not None:
+                    rects.append(rect)
+            return
+        
+        # Each star is a 2x2 block ending at its position, like a radius-1 circle,
+        # written in one vectorized pass straight into the surface pixels
+        r_shift, g_shift, b_shift, _ = target.get_shifts()
+        r_loss, g_loss, b_loss, _ = target.get_losses()
+        brightness = self.brightness[:n].astype(np.uint32)
+        colors = (((brightness >> r_loss) << r_shift) |
+                  ((brightness >> g_loss) << g_shift) |
+                  ((brightness >> b_loss) << b_shift))
+        
+        width, height = target.get_size()
+        xs = xs.astype(np.int32)
+        ys = ys.astype(np.int32)
+        if rects is not None:
+            rects.extend((x - 1, y - 1, 2, 2) for x, y in zip(xs.tolist(), ys.tolist()))
+        pixels = pygame.surfarray.pixels2d(target)
+        try:
+            for dx in (-1, 0):
+                for dy in (-1, 0):
+                    px = xs + dx
+                    py = ys + dy
+                    visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                    pixels[px[visible], py[visible]] = colors[visible]
+        finally:
+            del pixels
+
+class QualityGovernor:
+    """Sheds visual load when frames run over budget and restores it with headroom.
+
+    Frame work time is smoothed with an exponential moving average; the level
+    drops after a short run of slow frames and rises only after a longer run
+    of fast ones, so it does not oscillate.
+    """
+
+    def __init__(self, target_fps=FPS, auto=True, level=0):
+        self.budget = 1.0 / target_fps
+        self.auto = auto
+        self.level = level
+        self.average = self.budget * 0.5
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.downgrade_after = 30
+        self.upgrade_after = 180
+    
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+    
+    @property
+    def name(self):
+        return self.settings['name']
+    
+    def set_level(self, level):
+        self.level = max(0, min(len(QUALITY_LEVELS) - 1, level))
+        self.slow_frames = 0
+        self.fast_frames = 0
+    
+    def set_mode(self, mode):
+        """Select 'auto' or a fixed quality level by name"""
+        if mode == 'auto':
+            self.auto = True
+            return
+        self.auto = False
+        names = [quality['name'] for quality in QUALITY_LEVELS]
+        self.set_level(names.index(mode))
+    
+    def cycle(self):
+        """Step through auto, then each fixed level, then back to auto"""
+        if self.auto:
+            self.auto = False
+            self.set_level(0)
+        elif self.level == len(QUALITY_LEVELS) - 1:
+            self.auto = True
+        else:
+            self.set_level(self.level + 1)
+    
+    def observe(self, frame_time):
+        self.average += (frame_time - self.average) * 0.1
+        if not self.auto:
+            return
+        
+        if self.average > self.budget * 0.9:
+            self.slow_frames += 1
+            self.fast_frames = 0
+            if self.slow_frames >= self.downgrade_after and self.level < len(QUALITY_LEVELS) - 1:
+                self.set_level(self.level + 1)
+        elif self.average < self.budget * 0.5:
+            self.fast_frames += 1
+            self.slow_frames = 0
+            if self.fast_frames >= self.upgrade_after and self.level > 0:
+                self.set_level(self.level - 1)
+        else:
+            self.slow_frames = 0
+            self.fast_frames = 0
+    
+    def scale_particles(self, count):
+        scale = self.settings['particles']
+        if scale >= 1.0:
+            return count
+        return max(1, int(count * scale + 0.5))
+
+class SpatialHash:
+    """Uniform-grid broad-phase index over entity rects, rebuilt every tick"""
+
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+    
+    def cell_range(self, x, y, width, height):
+        cs = self.cell_size
+        x0 = math.floor(x / cs)
+        y0 = math.floor(y / cs)
+        x1 = math.floor((x + width) / cs)
+        y1 = math.floor((y + height) / cs)
+        return x0, y0, x1, y1
+    
+    def build(self, rects):
+        """Index an iterable of (x, y, width, height) tuples by position"""
+        self.cells.clear()
+        cells = self.cells
+        for index, rect in enumerate(rects):
+            x0, y0, x1, y1 = self.cell_range(*rect)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        cells[(cx, cy)] = [index]
+                    else:
+                        bucket.append(index)
+        return self
+    
+    def query(self, rect):
+        """Return candidate indices overlapping an (x, y, width, height) rect's cells, in insertion order"""
+        x0, y0, x1, y1 = self.cell_range(*rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return cells.get((x0, y0), [])
+        
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return sorted(found)
+
+def rects_overlap(a, b):
+    """Axis-aligned overlap test on (x, y, width, height) tuples"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and ax + aw > bx and ay < by + bh and ay + ah > by
+
+class SpriteAtlas:
+    """Entity sprites pre-rendered once into converted surfaces.
+
+    Sprites are keyed by kind and size; anything not built at startup is
+    rendered on first use and kept.
+    """
 
-class CosmicDefender:
     def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("🚀 Cosmic Defender - Created by AndreyVV")
+        self.sprites = {}
+    
+    def build(self):
+        for _ in self.build_steps():
+            pass
+    
+    def build_steps(self):
+        """Render every startup sprite, yielding after each so the work can be sliced"""
+        yield self.player(60, 40)
+        for enemy_type in ENEMY_COLORS:
+            yield self.enemy(enemy_type, 50 if enemy_type == 'tank' else 40,
+                             40 if enemy_type == 'tank' else 30)
+        yield self.bullet(False, 4, 15)
+        yield self.bullet(True, 4, 10)
+        for power_up_type in POWER_UP_COLORS:
+            for frame in range(PULSE_FRAMES):
+                yield self.power_up(power_up_type, frame, 25, 25)
+        for bar_width in (40, 50):
+            for filled in range(bar_width + 1):
+                yield self.health_bar(bar_width, filled)
+    
+    def finish(self, surface):
+        if pygame.display.get_surface() is not None:
+            return surface.convert_alpha() if surface.get_flags() & pygame.SRCALPHA else surface.convert()
+        return surface
+    
+    def cached(self, key, render):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.finish(render())
+        return sprite
+    
+    def player(self, width, height):
+        def render():
+            sprite = pygame.Surface((width, height))
+            sprite.fill(CYAN)
+            pygame.draw.polygon(sprite, WHITE, [(width//2, 0), (10, 20), (width - 10, 20)])
+            return sprite
+        return self.cached(('player', width, height), render)
+    
+    def enemy(self, enemy_type, width, height):
+        def render():
+            sprite = pygame.Surface((width, height))
+            sprite.fill(ENEMY_COLORS.get(enemy_type, RED))
+            return sprite
+        return self.cached(('enemy', enemy_type, width, height), render)
+    
+    def bullet(self, enemy, width, height):
+        def render():
+            sprite = pygame.Surface((width, height))
+            sprite.fill(RED if enemy else YELLOW)
+            if not enemy:
+                pygame.draw.rect(sprite, WHITE, (1, 0, width - 2, height // 2))
+            return sprite
+        return self.cached(('bullet', enemy, width, height), render)
+    
+    def power_up(self, power_up_type, frame, width, height):
+        def render():
+            pulse = 0.7 + 0.3 * frame / (PULSE_FRAMES - 1)
+            sprite = pygame.Surface((width, height))
+            sprite.fill(tuple(int(c * pulse) for c in POWER_UP_COLORS.get(power_up_type, GREEN)))
+            return sprite
+        return self.cached(('power_up', power_up_type, frame, width, height), render)
+    
+    def health_bar(self, bar_width, filled):
+        def render():
+            sprite = pygame.Surface((bar_width, 4))
+            sprite.fill(RED)
+            if filled > 0:
+                sprite.fill(GREEN, (0, 0, filled, 4))
+            return sprite
+        return self.cached(('health_bar', bar_width, filled), render)
+    
+    def particle(self, color, size, level):
+        """Disk stamp for additive blending, dimmed to level of PARTICLE_FADE_LEVELS.
+
+        The disk covers the same pixels as pygame.draw.circle(center, size)
+        when blitted at (x - size - 1, y - size - 1).
+        """
+        def render():
+            fade = level / PARTICLE_FADE_LEVELS
+            sprite = pygame.Surface((2 * size + 2, 2 * size + 2))
+            sprite.fill(BLACK)
+            pygame.draw.circle(sprite, tuple(int(c * fade) for c in color[:3]),
+                               (size + 1, size + 1), size)
+            return sprite
+        return self.cached(('particle', color, size, level), render)
+    
+    def ring(self, radius, color):
+        """Explosion ring, blitted at (x - radius - 1, y - radius - 1)"""
+        def render():
+            sprite = pygame.Surface((2 * radius + 2, 2 * radius + 2))
+            sprite.fill(BLACK)
+            sprite.set_colorkey(BLACK)
+            pygame.draw.circle(sprite, color, (radius + 1, radius + 1), radius, 3)
+            return sprite
+        return self.cached(('ring', radius, color), render)
+
+class ParticleRenderer:
+    """Draws a ParticleSystem as one additive Surface.blits batch of atlas stamps.
+
+    Every particle maps to a stamp key (palette color, size, fade level);
+    an object array indexed by key turns the whole system into its stamps
+    with one NumPy take, so Python only runs for keys not seen before.
+    """
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.palette = []
+        self.stamps = np.empty(0, dtype=object)
+        self.known = np.zeros(0, dtype=bool)
+    
+    def key(self, color_index, size, level):
+        return (color_index * 256 + size) * PARTICLE_FADE_LEVELS + level - 1
+    
+    def stamp(self, key):
+        level = key % PARTICLE_FADE_LEVELS + 1
+        size = key // PARTICLE_FADE_LEVELS % 256
+        color = self.palette[key // (PARTICLE_FADE_LEVELS * 256)]
+        return self.atlas.particle(color, size, level)
+    
+    def blits(self, particles, lag=0.0):
+        """Blit sequence for every live particle, lag ticks in the past, faded by life"""
+        n = particles.count
+        if n == 0:
+            return ()
+        
+        # Keys index the palette, so a system with a different palette starts over
+        if particles.palette[:len(self.palette)] != self.palette:
+            self.stamps = np.empty(0, dtype=object)
+            self.known = np.zeros(0, dtype=bool)
+        self.palette = list(particles.palette)
+        
+        x, y = particles.x[:n], particles.y[:n]
+        if lag:
+            # vy already includes this tick's gravity, the move used vy - gravity
+            x = x - particles.vx[:n] * lag
+            y = y - (particles.vy[:n] - PARTICLE_GRAVITY) * lag
+        size = particles.size[:n].astype(np.int32)
+        level = np.clip(np.ceil(particles.life[:n] * PARTICLE_FADE_LEVELS),
+                        1, PARTICLE_FADE_LEVELS).astype(np.int32)
+        keys = self.key(particles.color_index[:n].astype(np.int32), size, level)
+        
+        needed = int(keys.max()) + 1
+        if needed > len(self.stamps):
+            stamps = np.empty(needed, dtype=object)
+            stamps[:len(self.stamps)] = self.stamps
+            known = np.zeros(needed, dtype=bool)
+            known[:len(self.known)] = self.known
+            self.stamps, self.known = stamps, known
+        missing = keys[~self.known[keys]]
+        for key in np.unique(missing).tolist():
+            self.stamps[key] = self.stamp(key)
+            self.known[key] = True
+        
+        dests = np.stack((x.astype(np.int32) - size - 1, y.astype(np.int32) - size - 1), axis=1)
+        return zip(self.stamps[keys].tolist(), dests.tolist(), repeat(None), repeat(pygame.BLEND_ADD))
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (font, string, color)"""
+
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def clear(self):
+        self.surfaces.clear()
+
+# Per-tick player input, independent of where it comes from
+InputState = namedtuple('InputState', ['left', 'right', 'up', 'down', 'fire'])
+NO_INPUT = InputState(False, False, False, False, False)
+
+class KeyboardInput:
+    """Reads player input from the pygame keyboard state"""
+
+    def poll(self, game):
+        keys = pygame.key.get_pressed()
+        return InputState(keys[pygame.K_LEFT] or keys[pygame.K_a],
+                          keys[pygame.K_RIGHT] or keys[pygame.K_d],
+                          keys[pygame.K_UP] or keys[pygame.K_w],
+                          keys[pygame.K_DOWN] or keys[pygame.K_s],
+                          keys[pygame.K_SPACE])
+
+class ScriptedInput:
+    """Feeds input from a script: a callable(tick, game) or a sequence of InputStates"""
+
+    def __init__(self, script=None):
+        self.script = script if script is not None else weave_and_fire
+        self.tick = 0
+    
+    def poll(self, game):
+        if callable(self.script):
+            state = self.script(self.tick, game)
+        elif self.script:
+            state = self.script[self.tick % len(self.script)]
+        else:
+            state = NO_INPUT
+        self.tick += 1
+        return state
+
+def weave_and_fire(tick, game):
+    """Default headless script: sweep left and right while holding fire"""
+    phase = (tick // 90) % 2
+    return InputState(phase == 0, phase == 1, False, False, True)
+
+def chase_and_fire(tick, game):
+    """Script that lines up under the lowest enemy and holds fire"""
+    player = game.player
+    target = None
+    for enemy in game.enemies:
+        if target is None or enemy.y > target.y:
+            target = enemy
+    if target is None:
+        return InputState(False, False, False, False, True)
+    
+    offset = (target.x + target.width / 2) - (player.x + player.width / 2)
+    return InputState(offset < -player.speed, offset > player.speed, False, False, True)
+
+# Threat map: enemy bullets and enemies are swept along their motion and
+# rasterized into cells; each band is (first tick, last tick, weight)
+THREAT_CELL_SIZE = 16
+THREAT_BANDS = np.array([(0, 6, 10.0), (6, 15, 2.0), (15, 30, 0.3)])
+THREAT_ENEMY_WEIGHT = 3.0
+THREAT_MARGIN = 6
+
+# Built-in bot: candidate moves are scored now and BOT_LOOKAHEAD ticks ahead
+BOT_LOOKAHEAD = 6
+BOT_AIM_WEIGHT = 0.1
+BOT_HOME_Y = SCREEN_HEIGHT - 100
+# Player shot stats as fired by update_player and shoot_bullet
+BOT_SHOT_DAMAGE = 25
+BOT_SHOT_COOLDOWN = 10
+BOT_SHOT_SPEED = 12
+
+PILOT_MOVES = tuple(InputState(left, right, up, down, False)
+                    for left, right in ((False, False), (True, False), (False, True))
+                    for up, down in ((False, False), (True, False), (False, True)))
+
+class ThreatMapPilot:
+    """Built-in bot that dodges incoming fire and lines up under the nearest enemy.
+
+    Each tick every enemy bullet and enemy is swept along its path for the
+    next few ticks and rasterized into a coarse grid, weighted by how soon
+    it gets there. The grid's summed-area table prices any rectangle with
+    four lookups, so all candidate moves are scored at once by the threat
+    under the player now and a few ticks ahead, plus the distance to the
+    target.
+    """
+
+    def __init__(self, cell_size=THREAT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = -(-SCREEN_WIDTH // cell_size)
+        self.rows = -(-SCREEN_HEIGHT // cell_size)
+        self.threat_map = np.zeros((self.rows, self.cols))
+        self.summed = np.zeros((self.rows + 1, self.cols + 1))
+        self.move_dx = np.array([move.right - move.left for move in PILOT_MOVES])
+        self.move_dy = np.array([move.down - move.up for move in PILOT_MOVES])
+    
+    def sweeps(self, game):
+        """(x0, y0, x1, y1, weight) arrays covering where threats will be"""
+        bullets = game.bullets
+        falling = bullets.live('enemy')
+        bx = bullets.live('x')[falling]
+        by = bullets.live('y')[falling]
+        bw = bullets.live('width')[falling]
+        bh = bullets.live('height')[falling]
+        bspeed = bullets.live('speed')[falling]
+        
+        enemies = game.enemies
+        ex = enemies.live('x')
+        ey = enemies.live('y')
+        ew = enemies.live('width')
+        eh = enemies.live('height')
+        espeed = enemies.live('speed')
+        # Zigzag enemies can drift 3 px per tick either way
+        drift = np.where(enemies.live('type') == ENEMY_TYPES.index('zigzag'), 3, 0)
+        
+        # One row per band, one column per bullet then per enemy
+        first, last, weight = (column[:, None] for column in THREAT_BANDS.T)
+        x = np.concatenate((bx, ex))
+        y = np.concatenate((by, ey))
+        speed = np.concatenate((bspeed, espeed))
+        spread = np.concatenate((np.zeros(len(bx)), drift)) * last
+        return ((x - spread).ravel(), (y + speed * first).ravel(),
+                (x + np.concatenate((bw, ew)) + spread).ravel(),
+                (y + speed * last + np.concatenate((bh, eh))).ravel(),
+                (weight * np.concatenate((np.ones(len(bx)), np.full(len(ex), THREAT_ENEMY_WEIGHT)))).ravel())
+    
+    def build(self, game):
+        """Rasterize the sweeps with a 2D difference array, then integrate twice"""
+        x0, y0, x1, y1, weight = self.sweeps(game)
+        c0, c1, r0, r1 = self.cell_bounds(x0, y0, x1, y1)
+        stride = self.cols + 1
+        corners = np.concatenate((r0 * stride + c0, r0 * stride + c1, r1 * stride + c0, r1 * stride + c1))
+        diff = np.bincount(corners, np.concatenate((weight, -weight, -weight, weight)),
+                           minlength=(self.rows + 1) * stride).reshape(self.rows + 1, stride)
+        self.threat_map = diff.cumsum(0).cumsum(1)[:self.rows, :self.cols]
+        self.summed[1:, 1:] = self.threat_map.cumsum(0).cumsum(1)
+    
+    def cell_bounds(self, x0, y0, x1, y1):
+        """Pixel rect arrays to clamped cell ranges [c0, c1) x [r0, r1)"""
+        cs = self.cell_size
+        n = len(x0)
+        cols = np.minimum(np.maximum(np.concatenate((x0 // cs, -(-x1 // cs))), 0), self.cols).astype(np.intp)
+        rows = np.minimum(np.maximum(np.concatenate((y0 // cs, -(-y1 // cs))), 0), self.rows).astype(np.intp)
+        return cols[:n], cols[n:], rows[:n], rows[n:]
+    
+    def threat(self, x, y, width, height):
+        """Total threat over the cells each pixel rect touches"""
+        c0, c1, r0, r1 = self.cell_bounds(x, y, x + width, y + height)
+        summed = self.summed
+        return summed[r1, c1] - summed[r0, c1] - summed[r1, c0] + summed[r0, c0]
+    
+    def target_x(self, game):
+        """Center x of the enemy to line up under, or None
+
+        The nearest enemy that can still be shot down before it reaches the
+        player's line: lining up, the shots it takes and the bullet flight
+        must all fit in the ticks it has left. When none can, the nearest.
+        """
+        enemies = game.enemies
+        if not len(enemies):
+            return None
+        player = game.player
+        cx = enemies.live('x') + enemies.live('width') / 2
+        gap = player.y - enemies.live('y') - enemies.live('height')
+        offset = np.abs(cx - (player.x + player.width / 2))
+        needed = (offset / player.speed
+                  + np.ceil(enemies.live('health') / BOT_SHOT_DAMAGE) * BOT_SHOT_COOLDOWN
+                  + np.maximum(gap, 0) / BOT_SHOT_SPEED)
+        distance = np.hypot(offset, gap)
+        feasible = gap / enemies.live('speed') > needed
+        if feasible.any():
+            distance[~feasible] = np.inf
+        return float(cx[np.argmin(distance)])
+    
+    def lined_up(self, game):
+        """Whether a bullet fired now would run into an enemy above"""
+        enemies = game.enemies
+        player = game.player
+        x = player.x + player.width // 2 - 2
+        ex = enemies.live('x')
+        return bool(((ex < x + 4) & (ex + enemies.live('width') > x)
+                     & (enemies.live('y') < player.y)).any())
+    
+    def poll(self, game):
+        self.build(game)
+        player = game.player
+        margin = THREAT_MARGIN
+        moves = len(PILOT_MOVES)
+        # Each move held for one tick, then for BOT_LOOKAHEAD ticks; same clamping as update_player
+        ticks = np.repeat((player.speed, player.speed * BOT_LOOKAHEAD), moves)
+        x = np.minimum(np.maximum(player.x + np.tile(self.move_dx, 2) * ticks, 0), SCREEN_WIDTH - player.width)
+        y = np.minimum(np.maximum(player.y + np.tile(self.move_dy, 2) * ticks, 0), SCREEN_HEIGHT - player.height)
+        threat = self.threat(x - margin, y - margin, player.width + 2 * margin, player.height + 2 * margin)
+        cost = threat[:moves] + 0.5 * threat[moves:]
+        
+        # Prefer lining up under the target and staying near the bottom
+        target = self.target_x(game)
+        if target is not None:
+            cost += BOT_AIM_WEIGHT * np.abs(x[:moves] + player.width / 2 - target)
+        cost += np.abs(y[:moves] - BOT_HOME_Y) / SCREEN_HEIGHT
+        
+        # Hold fire unless the shot can land: the cooldown is the bottleneck
+        return PILOT_MOVES[int(np.argmin(cost))]._replace(fire=self.lined_up(game))
+
+# Named pilots for --pilot and the batch tools. A pilot is any input source:
+# an object whose poll(game) returns the InputState for the next tick
+PILOTS = {
+    'keyboard': KeyboardInput,
+    'weave': lambda: ScriptedInput(weave_and_fire),
+    'chase': lambda: ScriptedInput(chase_and_fire),
+    'bot': ThreatMapPilot,
+}
+
+# Replay log format: zlib-compressed header, one input byte per tick, checkpoints
+REPLAY_MAGIC = b'CDRP'
+REPLAY_VERSION = 3
+REPLAY_HEADER = struct.Struct('<4sBQII')  # magic, version, seed, ticks, checkpoint interval
+REPLAY_CHECKPOINT = struct.Struct('<IIIIII')  # tick, score, level, enemies, bullets, power-ups
+INPUT_BITS = ('left', 'right', 'up', 'down', 'fire')
+
+def pack_input(state):
+    bits = 0
+    for i, pressed in enumerate(state):
+        if pressed:
+            bits |= 1 << i
+    return bits
+
+def unpack_input(bits):
+    return InputState(*(bool(bits & (1 << i)) for i in range(len(INPUT_BITS))))
+
+class ReplayRecorder:
+    """Wraps an input source and logs each tick's input plus periodic state checkpoints"""
+
+    def __init__(self, source, checkpoint_interval=60):
+        self.source = source
+        self.checkpoint_interval = checkpoint_interval
+        self.inputs = bytearray()
+        self.checkpoints = []
+    
+    def poll(self, game):
+        tick = len(self.inputs)
+        if tick % self.checkpoint_interval == 0:
+            self.checkpoints.append((tick,) + game.state_signature())
+        state = self.source.poll(game)
+        self.inputs.append(pack_input(state))
+        return state
+    
+    def save(self, path, seed):
+        save_replay(path, seed, self.inputs, self.checkpoints, self.checkpoint_interval)
+
+class ReplayInput:
+    """Plays back a recorded input log and checks the game against its checkpoints"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.checkpoints = {cp[0]: cp[1:] for cp in replay['checkpoints']}
+        self.tick = 0
+        self.mismatches = []
+    
+    def poll(self, game):
+        tick = self.tick
+        expected = self.checkpoints.get(tick)
+        if expected is not None and expected != game.state_signature():
+            self.mismatches.append((tick, expected, game.state_signature()))
+        self.tick += 1
+        if tick < len(self.replay['inputs']):
+            return unpack_input(self.replay['inputs'][tick])
+        return NO_INPUT
+
+def save_replay(path, seed, inputs, checkpoints, checkpoint_interval):
+    payload = bytearray(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed,
+                                           len(inputs), checkpoint_interval))
+    payload += inputs
+    payload += struct.pack('<I', len(checkpoints))
+    for checkpoint in checkpoints:
+        payload += REPLAY_CHECKPOINT.pack(*checkpoint)
+    with open(path, 'wb') as f:
+        f.write(zlib.compress(bytes(payload), 9))
+
+def load_replay(path):
+    with open(path, 'rb') as f:
+        payload = zlib.decompress(f.read())
+    magic, version, seed, ticks, interval = REPLAY_HEADER.unpack_from(payload, 0)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError(f"{path} is not a Cosmic Defender replay (version {REPLAY_VERSION})")
+    
+    offset = REPLAY_HEADER.size
+    inputs = payload[offset:offset + ticks]
+    offset += ticks
+    count, = struct.unpack_from('<I', payload, offset)
+    offset += 4
+    checkpoints = [REPLAY_CHECKPOINT.unpack_from(payload, offset + i * REPLAY_CHECKPOINT.size)
+                   for i in range(count)]
+    return {
+        'seed': seed,
+        'inputs': inputs,
+        'checkpoint_interval': interval,
+        'checkpoints': checkpoints
+    }
+
+# Session snapshot format: zlib-compressed header, scalar state, RNG states,
+# then raw column bytes for every entity table. Numbers are little-endian.
+SNAPSHOT_MAGIC = b'CDSS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sBQ')  # magic, version, seed
+# game state, score, level, lives, health, max health, player x/y, previous
+# player x/y, enemy spawn timer, power-up timer, shoot timer, pilot tick
+SNAPSHOT_STATE = struct.Struct('<BqIqqqddddiiiq')
+SNAPSHOT_COUNT = struct.Struct('<I')
+SNAPSHOT_GAUSS = struct.Struct('<?d')  # Python random's cached gaussian, if any
+SNAPSHOT_NUMPY_RNG = struct.Struct('<16s16sBI')  # PCG64 state, increment, has_uint32, uinteger
+SNAPSHOT_POWER_UP = struct.Struct('<ddddddB')  # x, y, width, height, speed, pulse, type
+SNAPSHOT_EXPLOSION = struct.Struct('<dddddd')  # x, y, radius, max radius, life, decay
+GAME_STATES = ("MENU", "PLAYING", "PAUSED", "GAME_OVER")
+POWER_UP_TYPES = tuple(POWER_UP_COLORS)
+PARTICLE_COLUMNS = ('x', 'y', 'vx', 'vy', 'life', 'decay', 'color_index', 'size')
+QUICKSAVE_PATH = "quicksave.cdss"
+
+class SnapshotReader:
+    """Sequential reader over a decompressed snapshot payload"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.offset = 0
+    
+    def unpack(self, layout):
+        values = layout.unpack_from(self.payload, self.offset)
+        self.offset += layout.size
+        return values
+    
+    def count(self):
+        return self.unpack(SNAPSHOT_COUNT)[0]
+    
+    def array(self, dtype, count):
+        values = np.frombuffer(self.payload, dtype=dtype, count=count, offset=self.offset)
+        self.offset += values.nbytes
+        return values
+    
+    def take(self, size):
+        data = self.payload[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+def pack_numpy_rng(rng):
+    state = rng.bit_generator.state
+    if state['bit_generator'] != 'PCG64':
+        raise ValueError(f"Cannot snapshot a {state['bit_generator']} generator")
+    return SNAPSHOT_NUMPY_RNG.pack(state['state']['state'].to_bytes(16, 'little'),
+                                   state['state']['inc'].to_bytes(16, 'little'),
+                                   state['has_uint32'], state['uinteger'])
+
+def unpack_numpy_rng(rng, values):
+    state, inc, has_uint32, uinteger = values
+    rng.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger
+    }
+
+def encode_snapshot(game):
+    """Serialize everything the simulation needs to continue exactly where it is"""
+    player = game.player
+    source = game.input_source
+    pilot_tick = source.tick if isinstance(source, ScriptedInput) else -1
+    payload = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, game.seed))
+    payload += SNAPSHOT_STATE.pack(GAME_STATES.index(game.game_state), game.score, game.level,
+                                   game.lives, game.health, game.max_health, player.x, player.y,
+                                   game.player_prev[0], game.player_prev[1], game.enemy_spawn_timer,
+                                   game.power_up_timer, game.shoot_timer, pilot_tick)
+    difficulty = json.dumps(game.difficulty).encode()
+    payload += SNAPSHOT_COUNT.pack(len(difficulty)) + difficulty
+    
+    # Random generators: Python's Mersenne Twister words, then both PCG64 streams
+    _, words, gauss = game.rng.getstate()
+    payload += np.array(words, dtype=np.uint32).tobytes()
+    payload += SNAPSHOT_GAUSS.pack(gauss is not None, gauss or 0.0)
+    payload += pack_numpy_rng(game.np_rng) + pack_numpy_rng(game.fire_rng)
+    
+    for table in (game.bullets, game.enemies):
+        payload += SNAPSHOT_COUNT.pack(len(table))
+        for name in table.columns:
+            payload += table.live(name).tobytes()
+    
+    payload += SNAPSHOT_COUNT.pack(len(game.power_ups))
+    for p in game.power_ups:
+        payload += SNAPSHOT_POWER_UP.pack(p.x, p.y, p.width, p.height, p.speed, p.pulse,
+                                          POWER_UP_TYPES.index(p.type))
+    payload += SNAPSHOT_COUNT.pack(len(game.explosions))
+    for e in game.explosions:
+        payload += SNAPSHOT_EXPLOSION.pack(e.x, e.y, e.radius, e.max_radius, e.life, e.decay)
+    
+    particles = game.particles
+    payload += SNAPSHOT_COUNT.pack(particles.count)
+    for name in PARTICLE_COLUMNS:
+        payload += getattr(particles, name)[:particles.count].tobytes()
+    payload += SNAPSHOT_COUNT.pack(len(particles.palette))
+    payload += bytes(channel for color in particles.palette for channel in color[:3])
+    
+    stars = game.stars
+    payload += SNAPSHOT_COUNT.pack(stars.count) + SNAPSHOT_COUNT.pack(stars.layers)
+    for values in (stars.x, stars.y, stars.speed, stars.brightness):
+        payload += values.tobytes()
+    return zlib.compress(bytes(payload), 1)
+
+def decode_snapshot(game, data):
+    """Restore a game from encode_snapshot() output, replacing all simulation state"""
+    reader = SnapshotReader(zlib.decompress(data))
+    magic, version, seed = reader.unpack(SNAPSHOT_HEADER)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"Not a Cosmic Defender snapshot (version {SNAPSHOT_VERSION})")
+    
+    (state, score, level, lives, health, max_health, player_x, player_y, prev_x, prev_y,
+     spawn_timer, power_up_timer, shoot_timer, pilot_tick) = reader.unpack(SNAPSHOT_STATE)
+    difficulty = json.loads(reader.take(reader.count()))
+    
+    words = tuple(reader.array(np.uint32, 625).tolist())
+    has_gauss, gauss = reader.unpack(SNAPSHOT_GAUSS)
+    np_rng_state = reader.unpack(SNAPSHOT_NUMPY_RNG)
+    fire_rng_state = reader.unpack(SNAPSHOT_NUMPY_RNG)
+    
+    # Entity tables are read before anything is assigned, so a snapshot that
+    # does not fit leaves the game untouched
+    tables = []
+    for table in (game.bullets, game.enemies):
+        count = reader.count()
+        if count > table.capacity:
+            raise ValueError(f"Snapshot has {count} {table.name}, capacity is {table.capacity}")
+        tables.append((table, count, [reader.array(column.dtype, count) for column in table.columns.values()]))
+    pooled = []
+    for pool, layout in ((game.power_ups, SNAPSHOT_POWER_UP), (game.explosions, SNAPSHOT_EXPLOSION)):
+        count = reader.count()
+        if count > pool.capacity:
+            raise ValueError(f"Snapshot has {count} {pool.name}, capacity is {pool.capacity}")
+        pooled.append([reader.unpack(layout) for _ in range(count)])
+    power_ups, explosions = pooled
+    
+    particles = game.particles
+    particle_count = reader.count()
+    if particle_count > particles.capacity:
+        raise ValueError(f"Snapshot has {particle_count} particles, capacity is {particles.capacity}")
+    particle_columns = [reader.array(getattr(particles, name).dtype, particle_count)
+                        for name in PARTICLE_COLUMNS]
+    palette = reader.take(3 * reader.count())
+    
+    star_count = reader.count()
+    star_layers = reader.count()
+    star_columns = [reader.array(dtype, star_count)
+                    for dtype in (np.float32, np.float32, np.float32, np.uint8)]
+    
+    game.seed = seed
+    game.game_state = GAME_STATES[state]
+    game.score, game.level, game.lives = score, level, lives
+    game.health, game.max_health = health, max_health
+    game.player.x, game.player.y = player_x, player_y
+    game.player_prev = (prev_x, prev_y)
+    game.enemy_spawn_timer, game.power_up_timer, game.shoot_timer = spawn_timer, power_up_timer, shoot_timer
+    game.difficulty = difficulty
+    if pilot_tick >= 0 and isinstance(game.input_source, ScriptedInput):
+        game.input_source.tick = pilot_tick
+    
+    game.rng.setstate((3, words, gauss if has_gauss else None))
+    unpack_numpy_rng(game.np_rng, np_rng_state)
+    unpack_numpy_rng(game.fire_rng, fire_rng_state)
+    
+    for table, count, columns in tables:
+        for column, values in zip(table.columns.values(), columns):
+            column[:count] = values
+        table.count = count
+        table.high_water = max(table.high_water, count)
+    
+    game.power_ups.clear()
+    for x, y, width, height, speed, pulse, kind in power_ups:
+        game.power_ups.acquire(x=x, y=y, width=width, height=height, speed=speed,
+                               type=POWER_UP_TYPES[kind], pulse=pulse)
+    game.explosions.clear()
+    for x, y, radius, max_radius, life, decay in explosions:
+        game.explosions.acquire(x=x, y=y, radius=radius, max_radius=max_radius, life=life, decay=decay)
+    
+    for name, values in zip(PARTICLE_COLUMNS, particle_columns):
+        getattr(particles, name)[:particle_count] = values
+    particles.count = particle_count
+    particles.palette = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+    particles.palette_lookup = {color: index for index, color in enumerate(particles.palette)}
+    
+    stars = game.stars
+    stars.count = star_count
+    stars.layers = star_layers
+    stars.layer = (np.arange(star_count) % star_layers).astype(np.uint8)
+    stars.x, stars.y, stars.speed, stars.brightness = (values.copy() for values in star_columns)
+    
+    # Whatever was on screen belongs to the old session
+    game.presented_state = None
+
+def save_snapshot(game, path):
+    with open(path, 'wb') as f:
+        f.write(encode_snapshot(game))
+
+def load_snapshot(game, path):
+    with open(path, 'rb') as f:
+        decode_snapshot(game, f.read())
+
+class FrameProfiler:
+    """Per-stage frame timings with a rolling overlay and CSV/JSONL export.
+
+    Stages are timed by shadowing the game's methods on the instance while
+    profiling is enabled, so a disabled profiler adds no per-call overhead.
+    """
+
+    STAGES = (
+        'handle_events',
+        'update',
+        'update_player',
+        'update_bullets',
+        'update_enemies',
+        'update_particles',
+        'update_power_ups',
+        'update_explosions',
+        'update_stars',
+        'spawn_enemies',
+        'spawn_power_ups',
+        'check_collisions',
+        'draw',
+        'background',
+        'draw_game',
+        'draw_ui',
+        'present',
+        'wait_frame',
+    )
+    COUNTS = ('enemies', 'bullets', 'particles', 'power_ups', 'explosions')
+    
+    def __init__(self, history=240):
+        self.enabled = False
+        self.overlay = False
+        self.history = history
+        self.frame = 0
+        self.frame_start = 0.0
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.frame_times = deque(maxlen=history)
+        self.stage_times = {stage: deque(maxlen=history) for stage in self.STAGES}
+        self.output = None
+        self.writer = None
+    
+    def stage_targets(self, game):
+        for stage in self.STAGES:
+            if stage == 'background':
+                yield stage, game.background, 'draw'
+            else:
+                yield stage, game, stage
+    
+    def enable(self, game):
+        if self.enabled:
+            return
+        self.enabled = True
+        current = self.current
+        for stage, owner, attr in self.stage_targets(game):
+            original = getattr(owner, attr)
+            
+            def timed(*args, _original=original, _stage=stage):
+                start = time.perf_counter()
+                result = _original(*args)
+                current[_stage] += time.perf_counter() - start
+                return result
+            
+            setattr(owner, attr, timed)
+    
+    def disable(self, game):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for stage, owner, attr in self.stage_targets(game):
+            owner.__dict__.pop(attr, None)
+    
+    def toggle_overlay(self, game):
+        self.overlay = not self.overlay
+        if self.overlay:
+            self.enable(game)
+        elif self.output is None:
+            self.disable(game)
+    
+    def open_output(self, path):
+        """Stream one row per frame to path (.jsonl for JSON lines, CSV otherwise)"""
+        import csv
+        self.output = open(path, "w", newline="")
+        if not path.endswith(".jsonl"):
+            self.writer = csv.writer(self.output)
+            self.writer.writerow(('frame', 'frame_ms') +
+                                 tuple(f"{stage}_ms" for stage in self.STAGES) + self.COUNTS)
+    
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+            self.writer = None
+    
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        for stage in self.current:
+            self.current[stage] = 0.0
+    
+    def end_frame(self, game):
+        frame_time = time.perf_counter() - self.frame_start
+        self.frame += 1
+        self.frame_times.append(frame_time)
+        for stage, elapsed in self.current.items():
+            self.stage_times[stage].append(elapsed)
+        
+        if self.output is not None:
+            counts = self.entity_counts(game)
+            if self.writer is not None:
+                self.writer.writerow([self.frame, round(frame_time * 1000, 4)] +
+                                     [round(self.current[stage] * 1000, 4) for stage in self.STAGES] +
+                                     [counts[name] for name in self.COUNTS])
+            else:
+                row = {'frame': self.frame, 'frame_ms': round(frame_time * 1000, 4)}
+                row.update((f"{stage}_ms", round(elapsed * 1000, 4)) for stage, elapsed in self.current.items())
+                row.update(counts)
+                self.output.write(json.dumps(row) + "\n")
+    
+    def entity_counts(self, game):
+        return {
+            'enemies': len(game.enemies),
+            'bullets': len(game.bullets),
+            'particles': len(game.particles),
+            'power_ups': len(game.power_ups),
+            'explosions': len(game.explosions)
+        }
+    
+    def mean_ms(self, values):
+        return sum(values) / len(values) * 1000 if values else 0.0
+    
+    def draw_overlay(self, game, surface):
+        graph_width, graph_height = self.history, 80
+        left, top = SCREEN_WIDTH - graph_width - 20, 90
+        
+        panel = pygame.Surface((graph_width, graph_height))
+        panel.set_alpha(180)
+        panel.fill(BLACK)
+        surface.blit(panel, (left, top))
+        
+        # Rolling frame-time graph, 0-33 ms with a 60 FPS budget line
+        scale = graph_height / 33.3
+        budget_y = top + graph_height - int(1000 / FPS * scale)
+        pygame.draw.line(surface, YELLOW, (left, budget_y), (left + graph_width, budget_y))
+        for i, frame_time in enumerate(self.frame_times):
+            bar = min(graph_height, int(frame_time * 1000 * scale))
+            color = GREEN if frame_time * FPS <= 1.0 else RED
+            pygame.draw.line(surface, color, (left + i, top + graph_height),
+                             (left + i, top + graph_height - bar))
+        
+        # Per-stage means over the window, then entity counts
+        lines = [f"frame {self.mean_ms(self.frame_times):6.2f} ms"]
+        for stage in self.STAGES:
+            mean = self.mean_ms(self.stage_times[stage])
+            if mean >= 0.01:
+                lines.append(f"{stage:<18}{mean:6.2f} ms")
+        lines.extend(f"{name:<18}{count:6d}" for name, count in self.entity_counts(game).items())
+        
+        for i, line in enumerate(lines):
+            text = game.font_small.render(line, True, WHITE)
+            surface.blit(text, (left, top + graph_height + 6 + i * 18))
+        return pygame.Rect(left, top, SCREEN_WIDTH - left, graph_height + 6 + len(lines) * 18)
+
+# Memory instrumentation: sample every MEMORY_INTERVAL seconds of wall time,
+# flag a metric once it has risen across MEMORY_GROWTH_WINDOW samples in a row
+MEMORY_INTERVAL = 60.0
+MEMORY_GROWTH_WINDOW = 8
+MEMORY_TRACE_FRAMES = 8
+MEMORY_TOP_SITES = 15
+MEMORY_SITES_EVERY = 5
+MEMORY_LOG_BYTES = 1 << 20
+MEMORY_LOG_BACKUPS = 5
+
+class MemoryTracker:
+    """Periodic tracemalloc, GC and entity-count samples written to a rotating JSONL log.
+
+    Every MEMORY_SITES_EVERY samples also rank the live allocation sites,
+    attributing every traced block to the innermost hot-path function (a
+    FrameProfiler stage) on its traceback. The caller only reads the counters
+    and takes the tracemalloc snapshot (about 15 ms); ranking it takes up to
+    a second or two and runs on a helper thread, which also writes the log.
+    Tracing still makes every allocation several times slower, so this is an
+    instrumentation mode, off unless asked for.
+    """
+
+    METRICS = ('traced_kb', 'gc_objects') + FrameProfiler.COUNTS
+    
+    def __init__(self, interval=MEMORY_INTERVAL, window=MEMORY_GROWTH_WINDOW):
+        self.enabled = False
+        self.interval = interval
+        self.window = window
+        self.history = {metric: deque(maxlen=window) for metric in self.METRICS}
+        self.growing = set()
+        self.started = 0.0
+        self.next_sample = 0.0
+        self.samples = 0
+        self.writer = None
+        self.logger = None
+        self.hot_lines = {}
+        self.own_lines = set()
+    
+    def enable(self, game, path):
+        """Start tracing and log samples to path, rotated at MEMORY_LOG_BYTES"""
+        # Imported here so normal runs never load the logging machinery
+        import logging.handlers
+        import tracemalloc
+        if self.enabled:
+            return
+        self.enabled = True
+        self.logger = logging.getLogger(f"cosmic_defender.memory.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=MEMORY_LOG_BYTES,
+                                                       backupCount=MEMORY_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+        self.hot_lines = self.hot_path_lines(game)
+        self.own_lines = self.code_lines(function for function in vars(MemoryTracker).values()
+                                         if hasattr(function, '__code__'))
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+        self.started = time.perf_counter()
+        self.next_sample = self.started
+    
+    def close(self):
+        if self.logger is None:
+            return
+        # Let the last sample reach the log before its handler goes away
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        for handler in self.logger.handlers[:]:
+            handler.close()
+            self.logger.removeHandler(handler)
+        self.logger = None
+        self.enabled = False
+    
+    def code_lines(self, functions):
+        """(filename, line) pairs covered by the functions' code"""
+        import dis
+        return {(function.__code__.co_filename, line)
+                for function in functions for _, line in dis.findlinestarts(function.__code__)}
+    
+    def hot_path_lines(self, game):
+        """Map (filename, line) to the profiler stage whose code owns that line"""
+        lines = {}
+        for stage, owner, attr in game.profiler.stage_targets(game):
+            function = getattr(type(owner), attr, None)
+            if hasattr(function, '__code__'):
+                lines.update(dict.fromkeys(self.code_lines((function,)), stage))
+        return lines
+    
+    def poll(self, game, lock=None):
+        """Sample when one is due; only reading the entity counts is done under lock"""
+        now = time.perf_counter()
+        # A sample still being ranked holds the next one back rather than piling up
+        if now < self.next_sample or (self.writer is not None and self.writer.is_alive()):
+            return
+        self.next_sample = now + self.interval
+        if lock is None:
+            counts = game.profiler.entity_counts(game)
+        else:
+            with lock:
+                counts = game.profiler.entity_counts(game)
+        self.sample(counts, now)
+    
+    def sample(self, counts, now=None):
+        """Record the counters here and hand ranking and logging to the writer thread"""
+        import gc
+        import tracemalloc
+        now = time.perf_counter() if now is None else now
+        traced, peak = tracemalloc.get_traced_memory()
+        record = {
+            'time': round(time.time(), 3),
+            'uptime_s': round(now - self.started, 3),
+            'sample': self.samples,
+            'traced_kb': round(traced / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'gc_counts': list(gc.get_count()),
+            'gc_collections': [generation['collections'] for generation in gc.get_stats()],
+            'gc_objects': len(gc.get_objects()),
+        }
+        record.update(counts)
+        
+        # A metric is growing once it rose at every one of the last window samples
+        for metric in self.METRICS:
+            values = self.history[metric]
+            values.append(record[metric])
+            rising = len(values) == self.window and all(a < b for a, b in zip(values, list(values)[1:]))
+            if rising and metric not in self.growing:
+                print(f"⚠️  Memory: {metric} grew across the last {self.window} samples "
+                      f"({values[0]} -> {values[-1]})")
+            if rising:
+                self.growing.add(metric)
+            else:
+                self.growing.discard(metric)
+        record['growing'] = sorted(self.growing)
+        snapshot = tracemalloc.take_snapshot() if self.samples % MEMORY_SITES_EVERY == 0 else None
+        
+        self.samples += 1
+        self.writer = threading.Thread(target=self.write, args=(record, snapshot),
+                                       name="memory-writer", daemon=True)
+        self.writer.start()
+        return record
+    
+    def write(self, record, snapshot):
+        if snapshot is not None:
+            record['sites'] = self.top_sites(snapshot)
+        self.logger.info(json.dumps(record))
+    
+    def top_sites(self, snapshot, limit=MEMORY_TOP_SITES):
+        """Largest live allocation sites, each tagged with the hot-path function it ran under"""
+        import tracemalloc
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        sites = {}
+        for statistic in snapshot.statistics('traceback'):
+            frames = statistic.traceback
+            # The tracker's own history and records are not the game's memory
+            if any((frame.filename, frame.lineno) in self.own_lines for frame in frames):
+                continue
+            function = "(other)"
+            # Traceback frames run oldest first; the innermost hot-path frame wins
+            for frame in reversed(frames):
+                stage = self.hot_lines.get((frame.filename, frame.lineno))
+                if stage is not None:
+                    function = stage
+                    break
+            innermost = frames[-1]
+            key = (function, f"{innermost.filename}:{innermost.lineno}")
+            size, count = sites.get(key, (0, 0))
+            sites[key] = (size + statistic.size, count + statistic.count)
+        
+        ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [{'function': function, 'site': site, 'kb': round(size / 1024, 1), 'blocks': count}
+                for (function, site), (size, count) in ranked]
+
+def read_memory_log(path):
+    """Samples from a memory log and its rotated backups, oldest first"""
+    import os
+    paths = [f"{path}.{n}" for n in range(MEMORY_LOG_BACKUPS, 0, -1)] + [path]
+    samples = []
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path) as f:
+            samples.extend(json.loads(line) for line in f if line.strip())
+    return samples
+
+def summarize_memory_log(path, top=MEMORY_TOP_SITES):
+    samples = read_memory_log(path)
+    if not samples:
+        print(f"No memory samples in {path}")
+        return
+    first, last = samples[0], samples[-1]
+    hours = (last['time'] - first['time']) / 3600
+    print(f"🧠 {len(samples)} memory samples over {hours:.2f} h")
+    print(f"   {'metric':<14}{'first':>12}{'last':>12}{'min':>12}{'max':>12}")
+    for metric in MemoryTracker.METRICS:
+        values = [sample[metric] for sample in samples]
+        flag = "  ⚠️ growing" if metric in last['growing'] else ""
+        print(f"   {metric:<14}{values[0]:>12}{values[-1]:>12}{min(values):>12}{max(values):>12}{flag}")
+    print(f"   gc collections per generation: {last['gc_collections']}")
+    
+    # Latest ranked sites grouped by hot-path function, with growth since first seen
+    ranked = [sample for sample in samples if 'sites' in sample]
+    if not ranked:
+        return
+    first_seen = {}
+    for sample in ranked:
+        for site in sample['sites']:
+            first_seen.setdefault((site['function'], site['site']), site['kb'])
+    functions = {}
+    for site in ranked[-1]['sites'][:top]:
+        functions.setdefault(site['function'], []).append(site)
+    print(f"\n📍 Top allocation sites by hot-path function (sample {ranked[-1]['sample']})")
+    for function, sites in sorted(functions.items(), key=lambda item: -sum(site['kb'] for site in item[1])):
+        print(f"   {function} ({sum(site['kb'] for site in sites):.1f} KB)")
+        for site in sites:
+            delta = site['kb'] - first_seen[(site['function'], site['site'])]
+            print(f"      {site['kb']:>10.1f} KB {site['blocks']:>8} blocks {delta:>+10.1f} KB  {site['site']}")
+
+class CosmicDefender:
+    def __init__(self, headless=False, input_source=None, seed=None, star_count=STAR_COUNT,
+                 render_mode='capped', render_fps=FPS, quality='auto', difficulty=None,
+                 render_path='full', threaded=False, autoplay=False):
+        self.created = time.perf_counter()
+        self.first_frame_seconds = None
+        
+        # All gameplay randomness comes from these seeded generators
+        if seed is None:
+            seed = random.getrandbits(63)
+        if not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"seed must be between 0 and {MAX_SEED}, got {seed}")
+        self.seed = seed
+        self.rng = random.Random(seed)
+        
+        # Headless mode never opens a window and never draws. Only the display
+        # subsystem is brought up here; audio and joystick are never used and
+        # fonts initialize on first use
+        self.headless = headless
+        if headless:
+            self.screen = None
+        else:
+            pygame.display.init()
+            if render_mode == 'vsync':
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+            else:
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("🚀 Cosmic Defender - Created by AndreyVV")
+        if input_source is None:
+            input_source = ScriptedInput() if headless else KeyboardInput()
+        self.input_source = input_source
+        # With autoplay the pilot starts each game itself, for unattended soak runs
+        self.autoplay = autoplay
+        self.record_path = None
+        self.profiler = FrameProfiler()
+        self.memory = MemoryTracker()
         self.clock = pygame.time.Clock()
+        
+        # Rendering runs at its own rate; 0 means no frame cap (uncapped or vsync)
+        self.render_mode = render_mode
+        self.render_fps = max(render_fps, 0) if render_mode == 'capped' else 0
+        # Without a frame cap the quality budget is the default frame rate
+        self.quality = QualityGovernor(self.render_fps or FPS)
+        
+        # Dirty-rect rendering: only the rectangles drawn this frame or last
+        # frame are erased and pushed; static screens are presented once
+        self.render_path = render_path
+        self.dirty_rects = None
+        self.previous_dirty = []
+        self.presented_state = None
+        self.full_redraw = True
+        self.frame_unchanged = False
+        
+        # Threaded mode: simulation on a worker thread, rendering from snapshots;
+        # state_lock serializes update() with event handling and snapshotting
+        self.threaded = threaded
+        self.state_lock = threading.Lock()
+        self.quality.set_mode(quality)
         self.running = True
         self.game_state = "MENU"  # MENU, PLAYING, PAUSED, GAME_OVER
         
+        unknown = set(difficulty or ()) - set(DEFAULT_DIFFICULTY)
+        if unknown:
+            raise ValueError(f"Unknown difficulty parameters: {', '.join(sorted(unknown))}")
+        self.difficulty = dict(DEFAULT_DIFFICULTY, **(difficulty or {}))
+        self.background = BackgroundLayer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        
         # Game variables
         self.score = 0
         self.level = 1
@@ -55,40 +1929,96 @@ class CosmicDefender:
         self.max_health = 100
         
         # Player
-        self.player = {
-            'x': SCREEN_WIDTH // 2,
-            'y': SCREEN_HEIGHT - 100,
-            'width': 60,
-            'height': 40,
-            'speed': 8
-        }
+        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)
+        self.player_prev = (self.player.x, self.player.y)
         
         # Game objects
-        self.bullets = []
-        self.enemies = []
-        self.particles = []
-        self.power_ups = []
-        self.explosions = []
+        self.bullets = EntityTable('bullets', Bullet, MAX_BULLETS)
+        self.enemies = EntityTable('enemies', Enemy, MAX_ENEMIES)
+        self.np_rng = np.random.default_rng(seed)
+        # Batched gameplay draws; kept apart from np_rng, whose particle use
+        # varies with the quality level, so replays stay deterministic
+        self.fire_rng = np.random.default_rng([seed, 1])
+        self.particles = ParticleSystem(rng=self.np_rng)
+        self.power_ups = EntityPool('power_ups', PowerUp, MAX_POWER_UPS)
+        self.explosions = EntityPool('explosions', Explosion, MAX_EXPLOSIONS)
+        
+        # Pre-rendered entity sprites, built by warm_up() behind the menu
+        # (nothing to draw in headless mode)
+        self.atlas = SpriteAtlas()
+        self.particle_renderer = ParticleRenderer(self.atlas)
+        self.warmup = None if headless else self.warm_up_steps()
+        
+        # Text rendering caches: LRU for strings, per-label memo for the HUD,
+        # and pre-composited static screens keyed by what they display
+        self.text_cache = TextCache()
+        self.hud_labels = {}
+        self.screen_layers = {}
+        
+        # Broad-phase collision indices
+        self.enemy_grid = SpatialHash()
+        self.enemy_bullet_grid = SpatialHash()
+        self.power_up_grid = SpatialHash()
         
         # Timers
         self.enemy_spawn_timer = 0
         self.power_up_timer = 0
         self.shoot_timer = 0
         
-        # Fonts
-        self.font_large = pygame.font.Font(None, 72)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
+        # Fonts, loaded on first use
+        self.fonts = {}
         
         # Background stars
-        self.stars = []
-        for _ in range(200):
-            self.stars.append({
-                'x': random.randint(0, SCREEN_WIDTH),
-                'y': random.randint(0, SCREEN_HEIGHT),
-                'speed': random.uniform(0.5, 3.0),
-                'brightness': random.randint(100, 255)
-            })
+        self.stars = StarField(SCREEN_WIDTH, SCREEN_HEIGHT, star_count, rng=self.np_rng)
+    
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self.fonts[size] = pygame.font.Font(None, FONT_SIZES[size])
+        return font
+    
+    @property
+    def font_large(self):
+        return self.font('large')
+    
+    @property
+    def font_medium(self):
+        return self.font('medium')
+    
+    @property
+    def font_small(self):
+        return self.font('small')
+    
+    def warm_up_steps(self):
+        """Everything the first gameplay frames would otherwise render on demand"""
+        for size in FONT_SIZES:
+            yield self.font(size)
+        yield from self.atlas.build_steps()
+        for name, font, text in (('score', self.font_medium, "Score: 0"),
+                                 ('level', self.font_medium, "Level: 1"),
+                                 ('lives', self.font_medium, "Lives: 3")):
+            yield self.hud_text(name, font, text, WHITE)
+        yield self.static_layer('pause', None, self.compose_pause)
+    
+    def warm_up(self, budget=WARMUP_BUDGET):
+        """Run warm-up steps until budget seconds have passed or nothing is left"""
+        if self.warmup is None:
+            return
+        deadline = time.perf_counter() + budget
+        for _ in self.warmup:
+            if time.perf_counter() >= deadline:
+                return
+        self.warmup = None
+    
+    def pool_stats(self):
+        return {pool.name: pool.stats()
+                for pool in (self.bullets, self.enemies, self.power_ups, self.explosions)}
+    
+    def state_signature(self):
+        # Gameplay state only: particle counts are cosmetic and follow the quality level
+        return (self.score, self.level, len(self.enemies), len(self.bullets), len(self.power_ups))
     
     def handle_events(self):
         for event in pygame.event.get():
@@ -114,6 +2044,36 @@ class CosmicDefender:
                 
                 elif event.key == pygame.K_r and self.game_state == "GAME_OVER":
                     self.restart_game()
+                
+                elif event.key == pygame.K_F2:
+                    # Toggle cached background vs legacy per-scanline gradient
+                    self.background.cached = not self.background.cached
+                
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay(self)
+                
+                elif event.key == pygame.K_F4:
+                    self.quality.cycle()
+                
+                elif event.key == pygame.K_F5:
+                    self.quick_save()
+                
+                elif event.key == pygame.K_F9:
+                    self.quick_load()
+    
+    def quick_save(self, path=QUICKSAVE_PATH):
+        start = time.perf_counter()
+        save_snapshot(self, path)
+        print(f"💾 Quick-saved to {path} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    def quick_load(self, path=QUICKSAVE_PATH):
+        start = time.perf_counter()
+        try:
+            load_snapshot(self, path)
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Could not load {path}: {e}")
+            return
+        print(f"💾 Loaded {path} in {(time.perf_counter() - start) * 1000:.1f} ms")
     
     def start_game(self):
         self.game_state = "PLAYING"
@@ -126,13 +2086,23 @@ class CosmicDefender:
         self.particles.clear()
         self.power_ups.clear()
         self.explosions.clear()
-        self.player['x'] = SCREEN_WIDTH // 2
-        self.player['y'] = SCREEN_HEIGHT - 100
+        self.player.x = SCREEN_WIDTH // 2
+        self.player.y = SCREEN_HEIGHT - 100
+        self.player_prev = (self.player.x, self.player.y)
     
     def restart_game(self):
         self.start_game()
     
+    def resume(self):
+        """Get into PLAYING without discarding a game in progress, e.g. a loaded snapshot"""
+        if self.game_state == "PAUSED":
+            self.game_state = "PLAYING"
+        elif self.game_state != "PLAYING":
+            self.start_game()
+    
     def update(self):
+        if self.autoplay and self.game_state in ("MENU", "GAME_OVER"):
+            self.restart_game()
         if self.game_state == "PLAYING":
             self.update_player()
             self.update_bullets()
@@ -150,22 +2120,23 @@ class CosmicDefender:
                 self.game_state = "GAME_OVER"
     
     def update_player(self):
-        keys = pygame.key.get_pressed()
+        controls = self.input_source.poll(self)
+        self.player_prev = (self.player.x, self.player.y)
         
         # Movement
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            self.player['x'] = max(0, self.player['x'] - self.player['speed'])
-        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            self.player['x'] = min(SCREEN_WIDTH - self.player['width'], 
-                                 self.player['x'] + self.player['speed'])
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
-            self.player['y'] = max(0, self.player['y'] - self.player['speed'])
-        if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            self.player['y'] = min(SCREEN_HEIGHT - self.player['height'], 
-                                 self.player['y'] + self.player['speed'])
+        if controls.left:
+            self.player.x = max(0, self.player.x - self.player.speed)
+        if controls.right:
+            self.player.x = min(SCREEN_WIDTH - self.player.width, 
+                                 self.player.x + self.player.speed)
+        if controls.up:
+            self.player.y = max(0, self.player.y - self.player.speed)
+        if controls.down:
+            self.player.y = min(SCREEN_HEIGHT - self.player.height, 
+                                 self.player.y + self.player.speed)
         
         # Shooting
-        if keys[pygame.K_SPACE] and self.shoot_timer <= 0:
+        if controls.fire and self.shoot_timer <= 0:
             self.shoot_bullet()
             self.shoot_timer = 10
         
@@ -173,146 +2144,250 @@ class CosmicDefender:
             self.shoot_timer -= 1
     
     def shoot_bullet(self):
-        bullet = {
-            'x': self.player['x'] + self.player['width'] // 2 - 2,
-            'y': self.player['y'],
-            'width': 4,
-            'height': 15,
-            'speed': 12,
-            'damage': 25,
-            'enemy': False
-        }
-        self.bullets.append(bullet)
+        bullet = self.bullets.acquire(
+            x=self.player.x + self.player.width // 2 - 2,
+            y=self.player.y,
+            width=4,
+            height=15,
+            speed=12,
+            damage=25,
+            enemy=False
+        )
+        if bullet is None:
+            return
         
         # Create muzzle flash particles
-        for _ in range(8):
-            self.create_particle(bullet['x'], bullet['y'], YELLOW, 2)
+        self.create_particle(bullet.x, bullet.y, YELLOW, 2, 8)
     
     def update_bullets(self):
-        for bullet in self.bullets[:]:
-            if bullet['enemy']:
-                bullet['y'] += bullet['speed']
-                if bullet['y'] > SCREEN_HEIGHT:
-                    self.bullets.remove(bullet)
+        bullets = self.bullets
+        if not bullets.count:
+            return
+        if bullets.count < VECTORIZE_MIN_ROWS:
+            self.step_bullets()
+            return
+        enemy = bullets.live('enemy')
+        y = bullets.live('y')
+        
+        # Enemy bullets fall, player bullets rise
+        speed = bullets.live('speed')
+        y += np.where(enemy, speed, -speed)
+        gone = np.where(enemy, y > SCREEN_HEIGHT, y < -bullets.live('height'))
+        bullets.release_many(gone.nonzero()[0])
+    
+    def step_bullets(self):
+        """update_bullets for a few rows: the same float64 arithmetic on column lists"""
+        bullets = self.bullets
+        y = bullets.live('y')
+        ys = y.tolist()
+        gone = []
+        for index, (enemy, speed, height) in enumerate(zip(bullets.live('enemy').tolist(),
+                                                           bullets.live('speed').tolist(),
+                                                           bullets.live('height').tolist())):
+            if enemy:
+                ys[index] += speed
+                if ys[index] > SCREEN_HEIGHT:
+                    gone.append(index)
             else:
-                bullet['y'] -= bullet['speed']
-                if bullet['y'] < -bullet['height']:
-                    self.bullets.remove(bullet)
+                ys[index] -= speed
+                if ys[index] < -height:
+                    gone.append(index)
+        y[:] = ys
+        if gone:
+            bullets.release_many(gone)
     
     def spawn_enemies(self):
         self.enemy_spawn_timer += 1
-        spawn_rate = max(30 - self.level * 2, 15)
+        difficulty = self.difficulty
+        spawn_rate = max(difficulty['spawn_interval'] - self.level * difficulty['spawn_interval_step'],
+                         difficulty['spawn_interval_min'])
         
         if self.enemy_spawn_timer >= spawn_rate:
             self.enemy_spawn_timer = 0
             
-            enemy_type = random.choice(['basic', 'fast', 'tank', 'zigzag'])
+            enemy_type = self.rng.choice(['basic', 'fast', 'tank', 'zigzag'])
+            health = difficulty['enemy_health'] + self.level * difficulty['enemy_health_step']
             
-            enemy = {
-                'x': random.randint(0, SCREEN_WIDTH - 40),
-                'y': -40,
-                'width': 40,
-                'height': 30,
-                'speed': random.uniform(2, 4) + self.level * 0.3,
-                'health': 50 + self.level * 10,
-                'max_health': 50 + self.level * 10,
-                'type': enemy_type,
-                'direction': 1,
-                'shoot_timer': random.randint(60, 120)
-            }
+            enemy = self.enemies.acquire(
+                x=self.rng.randint(0, SCREEN_WIDTH - 40),
+                y=-40,
+                width=40,
+                height=30,
+                speed=self.rng.uniform(2, 4) + self.level * difficulty['enemy_speed_step'],
+                health=health,
+                max_health=health,
+                type=enemy_type,
+                direction=1,
+                shoot_timer=self.rng.randint(60, 120)
+            )
+            if enemy is None:
+                return
             
             # Customize enemy based on type
             if enemy_type == 'fast':
-                enemy['speed'] *= 1.5
-                enemy['health'] //= 2
-                enemy['max_health'] //= 2
+                enemy.speed *= 1.5
+                enemy.health //= 2
+                enemy.max_health //= 2
             elif enemy_type == 'tank':
-                enemy['speed'] *= 0.7
-                enemy['health'] *= 2
-                enemy['max_health'] *= 2
-                enemy['width'] = 50
-                enemy['height'] = 40
-            
-            self.enemies.append(enemy)
+                enemy.speed *= 0.7
+                enemy.health *= 2
+                enemy.max_health *= 2
+                enemy.width = 50
+                enemy.height = 40
     
     def update_enemies(self):
-        for enemy in self.enemies[:]:
-            # Movement based on type
-            if enemy['type'] == 'zigzag':
-                enemy['x'] += enemy['direction'] * 3
-                if enemy['x'] <= 0 or enemy['x'] >= SCREEN_WIDTH - enemy['width']:
-                    enemy['direction'] *= -1
-            
-            enemy['y'] += enemy['speed']
-            
-            # Enemy shooting
-            enemy['shoot_timer'] -= 1
-            if enemy['shoot_timer'] <= 0 and random.random() < 0.02:
-                self.enemy_shoot(enemy)
-                enemy['shoot_timer'] = random.randint(60, 120)
-            
-            # Remove enemies that go off screen
-            if enemy['y'] > SCREEN_HEIGHT:
-                self.enemies.remove(enemy)
-                self.health -= 10
-    
-    def enemy_shoot(self, enemy):
-        bullet = {
-            'x': enemy['x'] + enemy['width'] // 2 - 2,
-            'y': enemy['y'] + enemy['height'],
-            'width': 4,
-            'height': 10,
-            'speed': 6,
-            'damage': 15,
-            'enemy': True
-        }
-        self.bullets.append(bullet)
+        enemies = self.enemies
+        if not enemies.count:
+            return
+        if enemies.count < VECTORIZE_MIN_ROWS:
+            shooters, gone = self.step_enemies()
+        else:
+            shooters, gone = self.move_enemies()
+        
+        if len(shooters):
+            shooters = np.asarray(shooters, dtype=np.intp)
+            self.enemy_shoot(shooters)
+            enemies.live('shoot_timer')[shooters] = self.fire_rng.integers(60, 121, len(shooters))
+        
+        # Remove enemies that go off screen
+        if len(gone):
+            enemies.release_many(gone)
+            self.health -= 10 * len(gone)
+    
+    def move_enemies(self):
+        """Move every enemy and roll its shot; returns the (shooters, gone) row indices"""
+        enemies = self.enemies
+        x = enemies.live('x')
+        y = enemies.live('y')
+        
+        # Movement based on type: zigzag enemies also sweep sideways and bounce
+        zigzag = (enemies.live('type') == ENEMY_TYPES.index('zigzag')).nonzero()[0]
+        if len(zigzag):
+            direction = enemies.live('direction')
+            zig_x = x[zigzag] + direction[zigzag] * 3
+            x[zigzag] = zig_x
+            bounce = zigzag[(zig_x <= 0) | (zig_x >= SCREEN_WIDTH - enemies.live('width')[zigzag])]
+            direction[bounce] *= -1
+        
+        y += enemies.live('speed')
+        
+        # Enemy shooting: one batched roll for every enemy whose timer ran out
+        shoot_timer = enemies.live('shoot_timer')
+        shoot_timer -= 1
+        due = (shoot_timer <= 0).nonzero()[0]
+        shooters = due[self.fire_rng.random(len(due)) < 0.02] if len(due) else due
+        return shooters, (y > SCREEN_HEIGHT).nonzero()[0]
+    
+    def step_enemies(self):
+        """move_enemies for a few rows, with the per-row tests on column lists and the same fire_rng draws"""
+        enemies = self.enemies
+        zigzag = ENEMY_TYPES.index('zigzag')
+        x = enemies.live('x')
+        y = enemies.live('y')
+        kinds = enemies.live('type').tolist()
+        
+        # Movement based on type: zigzag enemies also sweep sideways and bounce
+        if zigzag in kinds:
+            direction = enemies.live('direction')
+            xs, directions = x.tolist(), direction.tolist()
+            for index, (kind, width) in enumerate(zip(kinds, enemies.live('width').tolist())):
+                if kind == zigzag:
+                    xs[index] += directions[index] * 3
+                    if xs[index] <= 0 or xs[index] >= SCREEN_WIDTH - width:
+                        direction[index] = -directions[index]
+            x[:] = xs
+        
+        y += enemies.live('speed')
+        shoot_timer = enemies.live('shoot_timer')
+        shoot_timer -= 1
+        due = [index for index, timer in enumerate(shoot_timer.tolist()) if timer <= 0]
+        gone = [index for index, value in enumerate(y.tolist()) if value > SCREEN_HEIGHT]
+        
+        # Enemy shooting: one batched roll for every enemy whose timer ran out
+        shooters = []
+        if due:
+            rolls = self.fire_rng.random(len(due)).tolist()
+            shooters = [index for index, roll in zip(due, rolls) if roll < 0.02]
+        return shooters, gone
+    
+    def enemy_shoot(self, shooters):
+        """Fire one bullet from each enemy row index in shooters"""
+        enemies = self.enemies
+        self.bullets.acquire_many(
+            len(shooters),
+            x=enemies.live('x')[shooters] + enemies.live('width')[shooters] // 2 - 2,
+            y=enemies.live('y')[shooters] + enemies.live('height')[shooters],
+            width=4,
+            height=10,
+            speed=6,
+            damage=15,
+            enemy=True
+        )
     
     def spawn_power_ups(self):
         self.power_up_timer += 1
         if self.power_up_timer >= 600:  # Every 10 seconds
             self.power_up_timer = 0
             
-            power_up_type = random.choice(['health', 'score', 'weapon', 'shield'])
+            power_up_type = self.rng.choice(['health', 'score', 'weapon', 'shield'])
             
-            power_up = {
-                'x': random.randint(50, SCREEN_WIDTH - 50),
-                'y': -30,
-                'width': 25,
-                'height': 25,
-                'speed': 3,
-                'type': power_up_type,
-                'pulse': 0
-            }
-            self.power_ups.append(power_up)
+            self.power_ups.acquire(
+                x=self.rng.randint(50, SCREEN_WIDTH - 50),
+                y=-30,
+                width=25,
+                height=25,
+                speed=3,
+                type=power_up_type,
+                pulse=0
+            )
     
     def update_power_ups(self):
-        for power_up in self.power_ups[:]:
-            power_up['y'] += power_up['speed']
-            power_up['pulse'] += 0.2
+        power_ups = self.power_ups
+        i = 0
+        while i < len(power_ups):
+            power_up = power_ups[i]
+            power_up.y += power_up.speed
+            power_up.pulse += 0.2
             
-            if power_up['y'] > SCREEN_HEIGHT:
-                self.power_ups.remove(power_up)
+            if power_up.y > SCREEN_HEIGHT:
+                power_ups.release(i)
+            else:
+                i += 1
     
     def check_collisions(self):
-        # Player bullets vs enemies
-        for bullet in self.bullets[:]:
-            if bullet['enemy']:
+        # Enemy and bullet columns are read once as plain lists; the narrow
+        # phase then works on (x, y, width, height) tuples
+        enemies = self.enemies
+        bullets = self.bullets
+        enemy_rects = list(enemies.rects())
+        enemy_health = enemies.live('health').tolist()
+        enemy_grid = self.enemy_grid.build(enemy_rects)
+        player = self.player
+        player_rect = (player.x, player.y, player.width, player.height)
+        dead_enemies = set()
+        spent_bullets = set()
+        bullet_rects = list(bullets.rects())
+        enemy_bullet = bullets.live('enemy').tolist()
+        damage = bullets.live('damage').tolist()
+        
+        # Player bullets vs enemies (one bullet hits at most one enemy)
+        for bullet_index, bullet in enumerate(bullet_rects):
+            if enemy_bullet[bullet_index]:
                 continue
-                
-            for enemy in self.enemies[:]:
-                if self.check_collision(bullet, enemy):
-                    enemy['health'] -= bullet['damage']
-                    self.bullets.remove(bullet)
+            for index in enemy_grid.query(bullet):
+                if index in dead_enemies:
+                    continue
+                enemy = enemy_rects[index]
+                if rects_overlap(bullet, enemy):
+                    enemy_health[index] -= damage[bullet_index]
+                    spent_bullets.add(bullet_index)
+                    x, y, width, height = enemy
                     
                     # Create hit particles
-                    for _ in range(10):
-                        self.create_particle(enemy['x'] + enemy['width']//2, 
-                                           enemy['y'] + enemy['height']//2, 
-                                           RED, 3)
+                    self.create_particle(x + width//2, y + height//2, RED, 3, 10)
                     
-                    if enemy['health'] <= 0:
-                        self.enemies.remove(enemy)
+                    if enemy_health[index] <= 0:
+                        dead_enemies.add(index)
                         self.score += 100 * self.level
                         
                         # Level up every 2000 points
@@ -320,149 +2395,178 @@ class CosmicDefender:
                             self.level += 1
                         
                         # Create explosion
-                        self.create_explosion(enemy['x'] + enemy['width']//2, 
-                                            enemy['y'] + enemy['height']//2)
+                        self.create_explosion(x + width//2, y + height//2)
                     break
+        if spent_bullets:
+            enemies.live('health')[:] = enemy_health
         
         # Enemy bullets vs player
-        for bullet in self.bullets[:]:
-            if not bullet['enemy']:
-                continue
-                
-            if self.check_collision(bullet, self.player):
-                self.bullets.remove(bullet)
-                self.health -= bullet['damage']
+        enemy_bullet_indices = [i for i, is_enemy in enumerate(enemy_bullet) if is_enemy]
+        enemy_bullets = [bullet_rects[i] for i in enemy_bullet_indices]
+        for index in self.enemy_bullet_grid.build(enemy_bullets).query(player_rect):
+            if rects_overlap(enemy_bullets[index], player_rect):
+                bullet_index = enemy_bullet_indices[index]
+                spent_bullets.add(bullet_index)
+                self.health -= damage[bullet_index]
                 
                 # Create damage particles
-                for _ in range(15):
-                    self.create_particle(self.player['x'] + self.player['width']//2,
-                                       self.player['y'] + self.player['height']//2,
-                                       RED, 4)
+                self.create_particle(player.x + player.width//2,
+                                     player.y + player.height//2,
+                                     RED, 4, 15)
+        
+        if spent_bullets:
+            bullets.release_many(spent_bullets)
         
         # Player vs enemies
-        for enemy in self.enemies[:]:
-            if self.check_collision(self.player, enemy):
-                self.enemies.remove(enemy)
+        for index in enemy_grid.query(player_rect):
+            if index in dead_enemies:
+                continue
+            if rects_overlap(player_rect, enemy_rects[index]):
+                dead_enemies.add(index)
                 self.health -= 30
                 self.lives -= 1
+                x, y, width, height = enemy_rects[index]
                 
                 # Create collision explosion
-                self.create_explosion(enemy['x'] + enemy['width']//2,
-                                    enemy['y'] + enemy['height']//2)
+                self.create_explosion(x + width//2, y + height//2)
+        
+        if dead_enemies:
+            enemies.release_many(dead_enemies)
         
         # Player vs power-ups
-        for power_up in self.power_ups[:]:
+        power_ups = self.power_ups
+        collected = []
+        for index in self.power_up_grid.build(power_ups.rects()).query(player_rect):
+            power_up = power_ups[index]
             if self.check_collision(self.player, power_up):
-                self.power_ups.remove(power_up)
+                collected.append(index)
                 
-                if power_up['type'] == 'health':
+                if power_up.type == 'health':
                     self.health = min(self.max_health, self.health + 30)
-                elif power_up['type'] == 'score':
+                elif power_up.type == 'score':
                     self.score += 500
-                elif power_up['type'] == 'weapon':
+                elif power_up.type == 'weapon':
                     pass  # Multi-shot for next 10 shots
-                elif power_up['type'] == 'shield':
+                elif power_up.type == 'shield':
                     self.health = min(self.max_health, self.health + 50)
                 
                 # Create pickup particles
-                for _ in range(12):
-                    self.create_particle(power_up['x'] + power_up['width']//2,
-                                       power_up['y'] + power_up['height']//2,
-                                       GREEN, 2)
+                self.create_particle(power_up.x + power_up.width//2,
+                                     power_up.y + power_up.height//2,
+                                     GREEN, 2, 12)
+        
+        if collected:
+            power_ups.release_many(collected)
     
     def check_collision(self, rect1, rect2):
-        return (rect1['x'] < rect2['x'] + rect2['width'] and
-                rect1['x'] + rect1['width'] > rect2['x'] and
-                rect1['y'] < rect2['y'] + rect2['height'] and
-                rect1['y'] + rect1['height'] > rect2['y'])
-    
-    def create_particle(self, x, y, color, size):
-        particle = {
-            'x': x,
-            'y': y,
-            'vx': random.uniform(-5, 5),
-            'vy': random.uniform(-5, 5),
-            'life': 1.0,
-            'decay': random.uniform(0.02, 0.05),
-            'color': color,
-            'size': size
-        }
-        self.particles.append(particle)
+        return (rect1.x < rect2.x + rect2.width and
+                rect1.x + rect1.width > rect2.x and
+                rect1.y < rect2.y + rect2.height and
+                rect1.y + rect1.height > rect2.y)
+    
+    def create_particle(self, x, y, color, size, count=1):
+        self.particles.emit(x, y, color, size, self.quality.scale_particles(count))
     
     def update_particles(self):
-        for particle in self.particles[:]:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['life'] -= particle['decay']
-            particle['vy'] += 0.2  # Gravity
-            
-            if particle['life'] <= 0:
-                self.particles.remove(particle)
+        self.particles.update()
     
     def create_explosion(self, x, y):
-        explosion = {
-            'x': x,
-            'y': y,
-            'radius': 5,
-            'max_radius': 50,
-            'life': 1.0,
-            'decay': 0.05
-        }
-        self.explosions.append(explosion)
+        self.explosions.acquire(
+            x=x,
+            y=y,
+            radius=5,
+            max_radius=50,
+            life=1.0,
+            decay=0.05
+        )
         
         # Create explosion particles
-        for _ in range(20):
-            self.create_particle(x, y, ORANGE, random.randint(2, 5))
+        self.create_particle(x, y, ORANGE, (2, 5), 20)
     
     def update_explosions(self):
-        for explosion in self.explosions[:]:
-            explosion['radius'] += 2
-            explosion['life'] -= explosion['decay']
+        explosions = self.explosions
+        i = 0
+        while i < len(explosions):
+            explosion = explosions[i]
+            explosion.radius += 2
+            explosion.life -= explosion.decay
             
-            if explosion['life'] <= 0 or explosion['radius'] >= explosion['max_radius']:
-                self.explosions.remove(explosion)
+            if explosion.life <= 0 or explosion.radius >= explosion.max_radius:
+                explosions.release(i)
+            else:
+                i += 1
     
     def update_stars(self):
-        for star in self.stars:
-            star['y'] += star['speed']
-            if star['y'] > SCREEN_HEIGHT:
-                star['y'] = -5
-                star['x'] = random.randint(0, SCREEN_WIDTH)
-    
-    def draw(self):
-        # Clear screen with gradient background
-        for y in range(SCREEN_HEIGHT):
-            color_intensity = int(20 * (1 - y / SCREEN_HEIGHT))
-            color = (color_intensity, color_intensity // 2, color_intensity * 2)
-            pygame.draw.line(self.screen, color, (0, y), (SCREEN_WIDTH, y))
+        self.stars.update()
+    
+    def draw(self, alpha=1.0, view=None):
+        """Render the current state; alpha in [0, 1] interpolates from the previous tick.
+
+        view is what gets drawn: the game itself, or a GameSnapshot published
+        by the simulation thread in threaded mode.
+        """
+        if self.headless:
+            return
+        view = view if view is not None else self
+        
+        # Only a running simulation moves between ticks
+        lag = 1.0 - alpha if view.game_state == "PLAYING" else 0.0
+        
+        if self.render_path == 'dirty':
+            # Static screens stay on the display until the state changes
+            state = view.game_state
+            self.frame_unchanged = (state != "PLAYING" and state == self.presented_state
+                                    and not self.profiler.overlay)
+            if self.frame_unchanged:
+                return
+            self.full_redraw = state != self.presented_state or state != "PLAYING"
+            self.presented_state = state
+            self.dirty_rects = []
+        
+        # Clear screen with gradient background, or just erase last frame's rects
+        if self.dirty_rects is not None and not self.full_redraw:
+            self.background.restore(self.screen, self.previous_dirty)
+        else:
+            self.background.draw(self.screen)
         
         # Draw stars
-        for star in self.stars:
-            brightness = star['brightness']
-            color = (brightness, brightness, brightness)
-            pygame.draw.circle(self.screen, color, 
-                             (int(star['x']), int(star['y'])), 1)
+        view.stars.draw(self.screen, lag, self.quality.settings['stars'], self.dirty_rects)
         
-        if self.game_state == "MENU":
+        if view.game_state == "MENU":
             self.draw_menu()
-        elif self.game_state == "PLAYING":
-            self.draw_game()
-        elif self.game_state == "PAUSED":
-            self.draw_game()
+        elif view.game_state == "PLAYING":
+            self.draw_game(lag, view)
+        elif view.game_state == "PAUSED":
+            self.draw_game(0.0, view)
             self.draw_pause()
-        elif self.game_state == "GAME_OVER":
-            self.draw_game_over()
+        elif view.game_state == "GAME_OVER":
+            self.draw_game_over(view)
     
     def draw_menu(self):
+        self.screen.blit(self.static_layer('menu', None, self.compose_menu), (0, 0))
+    
+    def static_layer(self, name, key, compose):
+        """Return a full-screen layer, composing it only when its key changes"""
+        cached = self.screen_layers.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, compose())
+            self.screen_layers[name] = cached
+        return cached[1]
+    
+    def blit_centered(self, layer, font, text, color, center):
+        surface = self.text_cache.render(font, text, color)
+        layer.blit(surface, surface.get_rect(center=center))
+    
+    def compose_menu(self):
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        
         # Title
-        title = self.font_large.render("🚀 COSMIC DEFENDER", True, CYAN)
-        title_rect = title.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
-        self.screen.blit(title, title_rect)
+        self.blit_centered(layer, self.font_large, "🚀 COSMIC DEFENDER", CYAN,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
         
         # Subtitle
-        subtitle = self.font_medium.render("Epic Space Shooter Game", True, WHITE)
-        subtitle_rect = subtitle.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3 + 80))
-        self.screen.blit(subtitle, subtitle_rect)
+        self.blit_centered(layer, self.font_medium, "Epic Space Shooter Game", WHITE,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//3 + 80))
         
         # Instructions
         instructions = [
@@ -474,181 +2578,459 @@ class CosmicDefender:
         ]
         
         for i, instruction in enumerate(instructions):
-            text = self.font_small.render(instruction, True, WHITE)
-            text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + i * 30))
-            self.screen.blit(text, text_rect)
+            self.blit_centered(layer, self.font_small, instruction, WHITE,
+                               (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + i * 30))
         
         # Credits
-        credits = self.font_small.render("Created by AndreyVV", True, YELLOW)
-        credits_rect = credits.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 50))
-        self.screen.blit(credits, credits_rect)
+        self.blit_centered(layer, self.font_small, "Created by AndreyVV", YELLOW,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT - 50))
+        return layer
+    
+    def mark(self, rect):
+        """Record a drawn rectangle for the dirty-rect renderer"""
+        if self.dirty_rects is not None:
+            self.dirty_rects.append(rect)
     
-    def draw_game(self):
+    def blit_layer(self, sprites):
+        rects = self.screen.blits(sprites, self.dirty_rects is not None)
+        if rects:
+            self.dirty_rects.extend(rects)
+    
+    def draw_game(self, lag=0.0, view=None):
+        """Draw entities lag ticks behind the simulation, stepping back along their velocity"""
+        view = view if view is not None else self
+        atlas = self.atlas
+        player = view.player
+        quality = self.quality.settings
+        
         # Draw player
-        pygame.draw.rect(self.screen, CYAN,
-                        (self.player['x'], self.player['y'], 
-                         self.player['width'], self.player['height']))
-        
-        # Draw player details
-        pygame.draw.polygon(self.screen, WHITE, [
-            (self.player['x'] + self.player['width']//2, self.player['y']),
-            (self.player['x'] + 10, self.player['y'] + 20),
-            (self.player['x'] + self.player['width'] - 10, self.player['y'] + 20)
-        ])
+        prev_x, prev_y = view.player_prev
+        self.mark(self.screen.blit(atlas.player(player.width, player.height),
+                                   (player.x + (prev_x - player.x) * lag,
+                                    player.y + (prev_y - player.y) * lag)))
         
-        # Draw bullets
-        for bullet in self.bullets:
-            color = RED if bullet['enemy'] else YELLOW
-            pygame.draw.rect(self.screen, color,
-                           (bullet['x'], bullet['y'], bullet['width'], bullet['height']))
-            if not bullet['enemy']:
-                pygame.draw.rect(self.screen, WHITE,
-                               (bullet['x']+1, bullet['y'], bullet['width']-2, bullet['height']//2))
-        
-        # Draw enemies
-        for enemy in self.enemies:
-            color = RED
-            if enemy['type'] == 'fast':
-                color = ORANGE
-            elif enemy['type'] == 'tank':
-                color = (128, 0, 128)
-            elif enemy['type'] == 'zigzag':
-                color = MAGENTA
-                
-            pygame.draw.rect(self.screen, color,
-                           (enemy['x'], enemy['y'], enemy['width'], enemy['height']))
-            
-            # Draw health bar
-            health_percent = enemy['health'] / enemy['max_health']
-            bar_width = enemy['width']
-            bar_height = 4
-            
-            pygame.draw.rect(self.screen, RED,
-                           (enemy['x'], enemy['y'] - 8, bar_width, bar_height))
-            pygame.draw.rect(self.screen, GREEN,
-                           (enemy['x'], enemy['y'] - 8, bar_width * health_percent, bar_height))
-        
-        # Draw power-ups
-        for power_up in self.power_ups:
-            pulse = abs(math.sin(power_up['pulse'])) * 0.3 + 0.7
-            color = GREEN
-            if power_up['type'] == 'score':
-                color = YELLOW
-            elif power_up['type'] == 'weapon':
-                color = CYAN
-            elif power_up['type'] == 'shield':
-                color = BLUE
-                
-            color = tuple(int(c * pulse) for c in color)
-            pygame.draw.rect(self.screen, color,
-                           (power_up['x'], power_up['y'], power_up['width'], power_up['height']))
+        # Draw bullets, enemies with health bars and power-ups, one batched blit per layer
+        bullets = view.bullets
+        enemy = bullets.live('enemy')
+        speed = bullets.live('speed')
+        bullet_y = bullets.live('y') + np.where(enemy, -speed, speed) * lag
+        bullet_sprites = [(atlas.bullet(is_enemy, width, height), (x, y))
+                          for is_enemy, width, height, x, y in zip(
+                              enemy.tolist(), bullets.live('width').tolist(),
+                              bullets.live('height').tolist(), bullets.live('x').tolist(),
+                              bullet_y.tolist())]
+        self.blit_layer(bullet_sprites)
+        
+        enemies = view.enemies
+        zigzag = enemies.live('type') == ENEMY_TYPES.index('zigzag')
+        enemy_x = enemies.live('x') - np.where(zigzag, enemies.live('direction') * 3 * lag, 0)
+        enemy_y = enemies.live('y') - enemies.live('speed') * lag
+        
+        # Health bars, quantized to whole pixels of fill
+        width = enemies.live('width')
+        filled = np.clip((width * enemies.live('health') / enemies.live('max_health')).astype(np.int32),
+                         0, width)
+        
+        enemy_sprites = []
+        bar_sprites = []
+        for kind, width, height, fill, x, y in zip(
+                enemies.live('type').tolist(), width.tolist(), enemies.live('height').tolist(),
+                filled.tolist(), enemy_x.tolist(), enemy_y.tolist()):
+            enemy_sprites.append((atlas.enemy(ENEMY_TYPES[kind], width, height), (x, y)))
+            bar_sprites.append((atlas.health_bar(width, fill), (x, y - 8)))
+        self.blit_layer(enemy_sprites)
+        if quality['health_bars']:
+            self.blit_layer(bar_sprites)
         
-        # Draw particles
-        for particle in self.particles:
-            pygame.draw.circle(self.screen, particle['color'],
-                             (int(particle['x']), int(particle['y'])), 
-                             int(particle['size']))
+        power_up_sprites = []
+        for power_up in view.power_ups:
+            pulse = abs(math.sin(power_up.pulse))
+            frame = int(pulse * (PULSE_FRAMES - 1) + 0.5)
+            power_up_sprites.append((atlas.power_up(power_up.type, frame, power_up.width,
+                                                    power_up.height),
+                                     (power_up.x, power_up.y - power_up.speed * lag)))
+        self.blit_layer(power_up_sprites)
+        
+        # Draw particles, additively blended and fading with life
+        self.blit_layer(self.particle_renderer.blits(view.particles, lag))
         
         # Draw explosions
-        for explosion in self.explosions:
-            color = (255, int(165 * explosion['life']), 0)
-            pygame.draw.circle(self.screen, color,
-                             (int(explosion['x']), int(explosion['y'])),
-                             int(explosion['radius']), 3)
+        if quality['explosion_rings']:
+            ring_sprites = []
+            for explosion in view.explosions:
+                radius = int(explosion.radius)
+                ring_sprites.append((atlas.ring(radius, (255, int(165 * explosion.life), 0)),
+                                     (int(explosion.x) - radius - 1, int(explosion.y) - radius - 1)))
+            self.blit_layer(ring_sprites)
         
         # Draw UI
-        self.draw_ui()
+        self.draw_ui(view)
     
-    def draw_ui(self):
-        # Score
-        score_text = self.font_medium.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (20, 20))
-        
-        # Level
-        level_text = self.font_medium.render(f"Level: {self.level}", True, WHITE)
-        self.screen.blit(level_text, (20, 60))
-        
-        # Lives
-        lives_text = self.font_medium.render(f"Lives: {self.lives}", True, WHITE)
-        self.screen.blit(lives_text, (20, 100))
+    def hud_text(self, name, font, text, color):
+        """Render a HUD label only when its text actually changes"""
+        cached = self.hud_labels.get(name)
+        if cached is None or cached[0] != text:
+            cached = (text, font.render(text, True, color))
+            self.hud_labels[name] = cached
+        return cached[1]
+    
+    def draw_ui(self, view=None):
+        view = view if view is not None else self
+        # Score, level and lives
+        self.blit_layer([
+            (self.hud_text('score', self.font_medium, f"Score: {view.score}", WHITE), (20, 20)),
+            (self.hud_text('level', self.font_medium, f"Level: {view.level}", WHITE), (20, 60)),
+            (self.hud_text('lives', self.font_medium, f"Lives: {view.lives}", WHITE), (20, 100))
+        ])
         
         # Health bar
         bar_width = 200
         bar_height = 20
-        health_percent = self.health / self.max_health
+        health_percent = view.health / view.max_health
         
-        pygame.draw.rect(self.screen, RED, (SCREEN_WIDTH - bar_width - 20, 20, bar_width, bar_height))
+        self.mark(pygame.draw.rect(self.screen, RED, (SCREEN_WIDTH - bar_width - 20, 20, bar_width, bar_height)))
         pygame.draw.rect(self.screen, GREEN, (SCREEN_WIDTH - bar_width - 20, 20, bar_width * health_percent, bar_height))
         
-        health_text = self.font_small.render(f"Health: {self.health}/{self.max_health}", True, WHITE)
-        self.screen.blit(health_text, (SCREEN_WIDTH - bar_width - 20, 45))
+        health_text = self.hud_text('health', self.font_small,
+                                    f"Health: {view.health}/{view.max_health}", WHITE)
+        
+        # Quality level
+        mode = "auto" if self.quality.auto else "fixed"
+        quality_text = self.hud_text('quality', self.font_small,
+                                     f"Quality: {self.quality.name} ({mode})", WHITE)
+        self.blit_layer([(health_text, (SCREEN_WIDTH - bar_width - 20, 45)),
+                         (quality_text, (SCREEN_WIDTH - bar_width - 20, 65))])
     
     def draw_pause(self):
+        self.screen.blit(self.static_layer('pause', None, self.compose_pause), (0, 0))
+    
+    def compose_pause(self):
         # Semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        layer.fill(BLACK + (128,))
         
         # Pause text
-        pause_text = self.font_large.render("PAUSED", True, CYAN)
-        pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-        self.screen.blit(pause_text, pause_rect)
-        
-        resume_text = self.font_medium.render("Press ESC or SPACE to Resume", True, WHITE)
-        resume_rect = resume_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
-        self.screen.blit(resume_text, resume_rect)
+        self.blit_centered(layer, self.font_large, "PAUSED", CYAN,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        self.blit_centered(layer, self.font_medium, "Press ESC or SPACE to Resume", WHITE,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
+        return layer
+    
+    def draw_game_over(self, view=None):
+        view = view if view is not None else self
+        layer = self.static_layer('game_over', (view.score, view.level),
+                                  lambda: self.compose_game_over(view))
+        self.screen.blit(layer, (0, 0))
     
-    def draw_game_over(self):
+    def compose_game_over(self, view):
         # Semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        layer.fill(BLACK + (180,))
         
         # Game Over text
-        game_over_text = self.font_large.render("GAME OVER", True, RED)
-        game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 100))
-        self.screen.blit(game_over_text, game_over_rect)
+        self.blit_centered(layer, self.font_large, "GAME OVER", RED,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 100))
         
         # Final score
-        final_score_text = self.font_medium.render(f"Final Score: {self.score}", True, WHITE)
-        final_score_rect = final_score_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40))
-        self.screen.blit(final_score_text, final_score_rect)
+        self.blit_centered(layer, self.font_medium, f"Final Score: {view.score}", WHITE,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40))
         
         # Level reached
-        level_text = self.font_medium.render(f"Level Reached: {self.level}", True, WHITE)
-        level_rect = level_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-        self.screen.blit(level_text, level_rect)
+        self.blit_centered(layer, self.font_medium, f"Level Reached: {view.level}", WHITE,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
         
         # Restart instructions
-        restart_text = self.font_medium.render("Press SPACE or R to Play Again", True, CYAN)
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
-        self.screen.blit(restart_text, restart_rect)
+        self.blit_centered(layer, self.font_medium, "Press SPACE or R to Play Again", CYAN,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
         
         # Credits
-        credits = self.font_small.render("Created by AndreyVV", True, YELLOW)
-        credits_rect = credits.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 50))
-        self.screen.blit(credits, credits_rect)
+        self.blit_centered(layer, self.font_small, "Created by AndreyVV", YELLOW,
+                           (SCREEN_WIDTH//2, SCREEN_HEIGHT - 50))
+        return layer
     
-    def run(self):
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
+    def present(self):
+        if self.first_frame_seconds is None:
+            self.first_frame_seconds = time.perf_counter() - self.created
+        if self.dirty_rects is None:
             pygame.display.flip()
-            self.clock.tick(FPS)
+            return
+        if self.frame_unchanged:
+            return
+        
+        rects = self.previous_dirty + self.dirty_rects
+        if self.full_redraw or len(rects) > DIRTY_RECT_LIMIT:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        self.previous_dirty = self.dirty_rects
+    
+    def wait_frame(self):
+        self.clock.tick(self.render_fps)
+    
+    def run(self):
+        if self.threaded:
+            self.run_threaded()
+        else:
+            self.run_single_threaded()
+        
+        self.profiler.close()
+        self.memory.close()
+        if self.record_path and isinstance(self.input_source, ReplayRecorder):
+            self.input_source.save(self.record_path, self.seed)
         
         pygame.quit()
         sys.exit()
+    
+    def run_threaded(self):
+        """Render the latest published snapshot while a worker thread simulates"""
+        simulation = SimulationThread(self)
+        try:
+            simulation.start()
+        except RuntimeError as e:
+            print(f"Could not start the simulation thread ({e}); running single-threaded")
+            self.threaded = False
+            self.run_single_threaded()
+            return
+        
+        try:
+            while self.running:
+                profiling = self.profiler.enabled
+                if profiling:
+                    self.profiler.begin_frame()
+                now = time.perf_counter()
+                
+                with self.state_lock:
+                    self.handle_events()
+                
+                snapshot = simulation.latest
+                if snapshot is not None:
+                    # The snapshot is one tick old the moment it is published
+                    self.draw(min(1.0, (now - snapshot.time) / SIM_DT), snapshot)
+                    if self.profiler.overlay and not self.frame_unchanged:
+                        self.mark(self.profiler.draw_overlay(self, self.screen))
+                    self.present()
+                self.quality.observe(time.perf_counter() - now)
+                if self.game_state == "MENU":
+                    self.warm_up()
+                self.wait_frame()
+                
+                if profiling:
+                    self.profiler.end_frame(self)
+                if self.memory.enabled:
+                    self.memory.poll(self, self.state_lock)
+        finally:
+            simulation.stop()
+        
+        if simulation.error is not None:
+            raise simulation.error
+    
+    def run_single_threaded(self):
+        # Fixed-timestep loop: simulate in SIM_DT steps for the real time that
+        # passed, then render interpolated between the last two ticks
+        accumulator = 0.0
+        previous = time.perf_counter()
+        while self.running:
+            profiling = self.profiler.enabled
+            if profiling:
+                self.profiler.begin_frame()
+            
+            now = time.perf_counter()
+            accumulator += min(now - previous, MAX_FRAME_TIME)
+            previous = now
+            
+            self.handle_events()
+            steps = 0
+            while accumulator >= SIM_DT and steps < MAX_STEPS_PER_FRAME:
+                self.update()
+                accumulator -= SIM_DT
+                steps += 1
+            if accumulator >= SIM_DT:
+                # Too far behind to catch up; drop the backlog rather than spiral
+                accumulator %= SIM_DT
+            
+            self.draw(accumulator / SIM_DT)
+            if self.profiler.overlay and not self.frame_unchanged:
+                self.mark(self.profiler.draw_overlay(self, self.screen))
+            self.present()
+            self.quality.observe(time.perf_counter() - now)
+            if self.game_state == "MENU":
+                self.warm_up()
+            self.wait_frame()
+            
+            if profiling:
+                self.profiler.end_frame(self)
+            if self.memory.enabled:
+                self.memory.poll(self)
+    
+    def run_headless(self, ticks, restart_on_game_over=True):
+        """Step update() as fast as possible with no rendering or frame cap"""
+        self.resume()
+        
+        games = 1
+        executed = 0
+        start = time.perf_counter()
+        profiler = self.profiler
+        while executed < ticks:
+            executed += 1
+            if profiler.enabled:
+                profiler.begin_frame()
+                self.update()
+                profiler.end_frame(self)
+            else:
+                self.update()
+            if self.memory.enabled:
+                self.memory.poll(self)
+            if self.game_state == "GAME_OVER":
+                if not restart_on_game_over:
+                    break
+                self.restart_game()
+                games += 1
+        elapsed = time.perf_counter() - start
+        profiler.close()
+        self.memory.close()
+        
+        return {
+            'ticks': executed,
+            'games': games,
+            'seconds': elapsed,
+            'ticks_per_second': executed / elapsed if elapsed > 0 else float('inf'),
+            'score': self.score,
+            'level': self.level,
+            'game_state': self.game_state
+        }
+
+def parse_args(argv=None):
+    # Imported here so importing the module for play or tooling skips argparse
+    import argparse
+    parser = argparse.ArgumentParser(description="Cosmic Defender - Epic Space Shooter Game")
+    parser.add_argument('--headless', action='store_true',
+                        help="run the simulation without a window or frame cap")
+    parser.add_argument('--ticks', type=int, default=36000,
+                        help="number of ticks to simulate in headless mode")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for the game's random number generators")
+    parser.add_argument('--pilot', choices=PILOTS, default=None,
+                        help="who flies the ship (default: keyboard, or weave when headless); "
+                             "pilots other than keyboard start and restart games themselves")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record per-tick input to a replay log")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="replay a recorded log headless at full speed and verify it")
+    parser.add_argument('--stars', type=int, default=STAR_COUNT,
+                        help="number of background stars")
+    parser.add_argument('--render', choices=RENDER_MODES, default='capped',
+                        help="frame pacing: capped at --render-fps, uncapped, or vsync")
+    parser.add_argument('--render-fps', type=int, default=FPS,
+                        help="frame cap in capped render mode (simulation stays at 60 Hz)")
+    parser.add_argument('--render-path', choices=RENDER_PATHS, default='full',
+                        help="present full frames, or only the rectangles that changed")
+    parser.add_argument('--threaded', action='store_true',
+                        help="simulate on a worker thread and render published snapshots")
+    parser.add_argument('--quality', choices=('auto',) + tuple(q['name'] for q in QUALITY_LEVELS),
+                        default='auto', help="visual quality level, or auto to adapt to frame time")
+    parser.add_argument('--profile-out', metavar='PATH',
+                        help="stream per-frame stage timings to a .csv or .jsonl file")
+    parser.add_argument('--memory-log', metavar='PATH',
+                        help="sample tracemalloc, GC and entity counts to a rotating JSONL log")
+    parser.add_argument('--memory-interval', type=float, default=MEMORY_INTERVAL, metavar='SECONDS',
+                        help="wall time between memory samples")
+    parser.add_argument('--memory-summary', metavar='PATH',
+                        help="summarize a memory log: growth flags and top allocation sites")
+    parser.add_argument('--load-snapshot', metavar='PATH',
+                        help="start from a saved session snapshot (also applies to --replay)")
+    parser.add_argument('--save-snapshot', metavar='PATH',
+                        help="save a session snapshot when a headless run ends")
+    args = parser.parse_args(argv)
+    if args.seed is not None and not 0 <= args.seed <= MAX_SEED:
+        parser.error(f"--seed must be between 0 and {MAX_SEED}")
+    if args.headless and args.pilot == 'keyboard':
+        parser.error("--pilot keyboard needs a window")
+    return args
+
+def run_replay_cli(args):
+    replay = load_replay(args.replay)
+    source = ReplayInput(replay)
+    game = CosmicDefender(headless=True, input_source=source, seed=replay['seed'])
+    if args.load_snapshot:
+        load_snapshot(game, args.load_snapshot)
+    report = game.run_headless(len(replay['inputs']))
+    print(f"Replayed {report['ticks']} ticks in {report['seconds']:.2f}s "
+          f"({report['ticks_per_second']:.0f} ticks/s)")
+    print(f"Final score: {report['score']}  Level: {report['level']}")
+    pygame.quit()
+    if source.mismatches:
+        tick, expected, actual = source.mismatches[0]
+        print(f"❌ Replay diverged at tick {tick}: expected {expected}, got {actual}")
+        sys.exit(1)
+    print(f"✅ Replay matched {len(replay['checkpoints'])} checkpoints")
+
+def run_headless_cli(args):
+    source = PILOTS[args.pilot]() if args.pilot else None
+    game = CosmicDefender(headless=True, input_source=source, seed=args.seed, star_count=args.stars)
+    if args.load_snapshot:
+        start = time.perf_counter()
+        load_snapshot(game, args.load_snapshot)
+        print(f"Loaded {args.load_snapshot} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if args.profile_out:
+        game.profiler.open_output(args.profile_out)
+        game.profiler.enable(game)
+    if args.memory_log:
+        game.memory.interval = args.memory_interval
+        game.memory.enable(game, args.memory_log)
+    if args.record:
+        game.input_source = ReplayRecorder(game.input_source)
+    report = game.run_headless(args.ticks)
+    if args.record:
+        game.input_source.save(args.record, game.seed)
+    if args.save_snapshot:
+        start = time.perf_counter()
+        save_snapshot(game, args.save_snapshot)
+        print(f"Saved {args.save_snapshot} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"Simulated {report['ticks']} ticks ({report['games']} games) "
+          f"in {report['seconds']:.2f}s")
+    print(f"Ticks per second: {report['ticks_per_second']:.0f}")
+    print(f"Final score: {report['score']}  Level: {report['level']}")
+    for name, stats in game.pool_stats().items():
+        print(f"Pool {name}: high water {stats['high_water']}/{stats['capacity']}, "
+              f"dropped {stats['dropped']}")
+    pygame.quit()
 
 def main():
     """Main function to run the game"""
+    args = parse_args()
+    if args.memory_summary:
+        summarize_memory_log(args.memory_summary)
+        return
+    if args.replay:
+        run_replay_cli(args)
+        return
+    if args.headless:
+        run_headless_cli(args)
+        return
+    
     try:
         print("🚀 Starting Cosmic Defender...")
         print("Created by AndreyVV")
         print("Controls: WASD/Arrow Keys to move, SPACE to shoot, ESC to pause")
-        game = CosmicDefender()
+        print("F5 quick-saves the session, F9 loads the quick-save")
+        pilot = args.pilot or 'keyboard'
+        if pilot != 'keyboard':
+            print(f"Pilot: {pilot} (plays unattended, restarting after each game over)")
+        game = CosmicDefender(input_source=PILOTS[pilot](), seed=args.seed, star_count=args.stars,
+                              render_mode=args.render, render_fps=args.render_fps,
+                              quality=args.quality, render_path=args.render_path,
+                              threaded=args.threaded, autoplay=pilot != 'keyboard')
+        if args.load_snapshot:
+            load_snapshot(game, args.load_snapshot)
+        if args.profile_out:
+            game.profiler.open_output(args.profile_out)
+            game.profiler.enable(game)
+        if args.memory_log:
+            game.memory.interval = args.memory_interval
+            game.memory.enable(game, args.memory_log)
+        if args.record:
+            game.input_source = ReplayRecorder(game.input_source)
+            game.record_path = args.record
         game.run()
     except Exception as e:
         print(f"Error running game: {e}")
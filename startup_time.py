@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+🚀 COSMIC DEFENDER - Startup Time
+Created by AndreyVV
+
+Measures how long the game takes to come up. Each run starts a fresh
+interpreter with -X importtime, then times importing the game module,
+constructing CosmicDefender, the first presented menu frame and the
+background warm-up. The slowest imports are ranked by cumulative time.
+
+Usage:
+    python startup_time.py
+    python startup_time.py --runs 10 --top 20 --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+def child():
+    """Runs inside the measured interpreter; prints one JSON line of phase timings"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+    start = time.perf_counter()
+    import osmic_defender_game
+    imported = time.perf_counter()
+    game = osmic_defender_game.CosmicDefender(input_source=osmic_defender_game.ScriptedInput())
+    created = time.perf_counter()
+    game.draw()
+    game.present()
+    presented = time.perf_counter()
+    while game.warmup is not None:
+        game.warm_up()
+    warmed = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'init_ms': (created - imported) * 1000,
+        'first_frame_ms': (presented - created) * 1000,
+        'time_to_first_frame_ms': (presented - start) * 1000,
+        'game_first_frame_ms': game.first_frame_seconds * 1000,
+        'warmup_ms': (warmed - presented) * 1000,
+    }))
+
+def parse_importtime(stderr):
+    """Map module name to (self, cumulative) import microseconds from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+def measure(runs):
+    samples = []
+    imports = {}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+                                cwd=here, capture_output=True, text=True, check=True)
+        wall = time.perf_counter() - start
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample['process_ms'] = wall * 1000
+        samples.append(sample)
+        for name, timing in parse_importtime(result.stderr).items():
+            imports.setdefault(name, []).append(timing)
+    return samples, imports
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+def main():
+    if "--child" in sys.argv:
+        child()
+        return
+
+    parser = argparse.ArgumentParser(description="Cosmic Defender startup time")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to measure")
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list")
+    parser.add_argument('--output', metavar='PATH', help="write the medians as JSON")
+    args = parser.parse_args()
+
+    print(f"🚀 Measuring startup over {args.runs} runs...")
+    samples, imports = measure(args.runs)
+
+    phases = {key: median(sample[key] for sample in samples) for key in samples[0]}
+    print("\n⏱️  Startup phases (median ms)")
+    for key, value in phases.items():
+        print(f"   {key:<24}{value:>10.1f}")
+
+    ranked = sorted(((median(t[1] for t in timings), median(t[0] for t in timings), name)
+                     for name, timings in imports.items()), reverse=True)[:args.top]
+    print("\n📦 Slowest imports (median ms)")
+    print(f"   {'module':<40}{'cumulative':>12}{'self':>10}")
+    for cumulative_us, self_us, name in ranked:
+        print(f"   {name:<40}{cumulative_us / 1000:>12.1f}{self_us / 1000:>10.1f}")
+
+    if args.output:
+        report = {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'runs': args.runs,
+            'phases_ms': phases,
+            'imports_ms': [{'module': name, 'cumulative': cumulative_us / 1000, 'self': self_us / 1000}
+                           for cumulative_us, self_us, name in ranked],
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
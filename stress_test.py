@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+🚀 COSMIC DEFENDER - Stress Test
+Created by AndreyVV
+
+Floods the arena to find where the engine falls over. For each subsystem
+the entity count is ramped geometrically (hundreds, thousands, tens of
+thousands) and held at each plateau while update and draw are timed; the
+ramp stops once the mean frame time passes a ceiling. The result is a
+scaling curve per subsystem that can be tracked across releases.
+
+Usage:
+    python stress_test.py
+    python stress_test.py --subsystem particles --ceiling-ms 33 --output stress.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import numpy as np
+from osmic_defender_game import (CosmicDefender, ScriptedInput, ParticleSystem, EntityTable,
+                                 Enemy, Bullet, SCREEN_WIDTH, SCREEN_HEIGHT, ORANGE)
+
+SUBSYSTEMS = ('enemies', 'bullets', 'particles')
+
+# Stages reported on each plateau, as timed by the game's FrameProfiler
+CURVE_STAGES = ('update_enemies', 'update_bullets', 'update_particles',
+                'check_collisions', 'draw_game', 'update', 'draw')
+
+class StressDriver:
+    """Overrides the game's spawners so entity counts are held at a target"""
+
+    def __init__(self, game, max_count):
+        self.game = game
+        self.targets = dict.fromkeys(SUBSYSTEMS, 0)
+        game.enemies = EntityTable('enemies', Enemy, max_count)
+        game.bullets = EntityTable('bullets', Bullet, max_count * 2)
+        game.particles = ParticleSystem(capacity=max_count + 1024, rng=game.np_rng)
+        game.spawn_enemies = self.spawn_enemies
+        game.enemy_shoot = self.enemy_shoot
+
+    def spawn_enemies(self):
+        game = self.game
+        rng = game.rng
+        for _ in range(self.targets['enemies'] - len(game.enemies)):
+            tank = rng.random() < 0.25
+            game.enemies.acquire(
+                x=rng.uniform(0, SCREEN_WIDTH - 50),
+                y=rng.uniform(-40, SCREEN_HEIGHT - 200),
+                width=50 if tank else 40,
+                height=40 if tank else 30,
+                speed=rng.uniform(0.5, 2),
+                health=10 ** 6,
+                max_health=10 ** 6,
+                type=rng.choice(['basic', 'fast', 'tank', 'zigzag']),
+                direction=1,
+                shoot_timer=rng.randint(60, 120)
+            )
+
+    def enemy_shoot(self, shooters):
+        # Natural enemy fire counts toward the bullet target instead of adding to it
+        enemies = self.game.enemies
+        room = max(0, self.targets['bullets'] - len(self.game.bullets))
+        shooters = shooters[:room]
+        self.game.bullets.acquire_many(
+            len(shooters),
+            x=enemies.live('x')[shooters] + enemies.live('width')[shooters] // 2 - 2,
+            y=enemies.live('y')[shooters] + enemies.live('height')[shooters],
+            width=4, height=10, speed=6, damage=0, enemy=True)
+
+    def top_up(self):
+        game = self.game
+        rng = game.rng
+        # Damage from a flooded arena must never end the run
+        game.health = game.max_health = 10 ** 9
+        game.lives = 10 ** 9
+
+        missing = self.targets['bullets'] - len(game.bullets)
+        if missing > 0:
+            enemy = game.np_rng.random(missing) < 0.5
+            game.bullets.acquire_many(
+                missing,
+                x=game.np_rng.uniform(0, SCREEN_WIDTH, missing),
+                y=game.np_rng.uniform(0, SCREEN_HEIGHT, missing),
+                width=4, height=np.where(enemy, 10, 15), speed=np.where(enemy, 6, 12),
+                damage=0, enemy=enemy)
+
+        missing = self.targets['particles'] - len(game.particles)
+        while missing > 0:
+            count = min(missing, 25)
+            game.particles.emit(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT),
+                                ORANGE, (2, 5), count)
+            missing -= count
+
+def measure_plateau(game, driver, warmup, ticks):
+    profiler = game.profiler
+    for _ in range(warmup):
+        driver.top_up()
+        game.update()
+        game.draw()
+
+    frame_times = []
+    stage_totals = dict.fromkeys(CURVE_STAGES, 0.0)
+    for _ in range(ticks):
+        driver.top_up()
+        profiler.begin_frame()
+        start = time.perf_counter()
+        game.update()
+        game.draw()
+        frame_times.append(time.perf_counter() - start)
+        for stage in CURVE_STAGES:
+            stage_totals[stage] += profiler.current[stage]
+        profiler.end_frame(game)
+
+    frame_times.sort()
+    return {
+        'frame_ms': sum(frame_times) / ticks * 1000,
+        'frame_p95_ms': frame_times[int(0.95 * (ticks - 1))] * 1000,
+        'stages_ms': {stage: total / ticks * 1000 for stage, total in stage_totals.items()},
+        'enemies': len(game.enemies),
+        'bullets': len(game.bullets),
+        'particles': len(game.particles),
+    }
+
+def ramp(subsystem, args):
+    game = CosmicDefender(input_source=ScriptedInput(), seed=args.seed, quality='high')
+    game.start_game()
+    driver = StressDriver(game, args.max_count)
+    game.profiler.enable(game)
+
+    curve = []
+    count = args.start
+    while count <= args.max_count:
+        driver.targets[subsystem] = count
+        plateau = measure_plateau(game, driver, args.warmup, args.ticks)
+        plateau['target'] = count
+        curve.append(plateau)
+        print(f"   {count:>8}{plateau['frame_ms']:>10.2f}{plateau['frame_p95_ms']:>10.2f}"
+              + "".join(f"{plateau['stages_ms'][stage]:>10.2f}" for stage in CURVE_STAGES[:5]))
+        if plateau['frame_ms'] > args.ceiling_ms:
+            print(f"   ⛔ frame time ceiling {args.ceiling_ms} ms reached at {count} {subsystem}")
+            break
+        count = int(count * args.factor)
+
+    game.profiler.disable(game)
+    return curve
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosmic Defender stress test")
+    parser.add_argument('--subsystem', choices=SUBSYSTEMS, action='append',
+                        help="subsystem to ramp (repeatable, default: all)")
+    parser.add_argument('--start', type=int, default=100, help="entity count of the first plateau")
+    parser.add_argument('--factor', type=float, default=2.0, help="growth factor between plateaus")
+    parser.add_argument('--max-count', type=int, default=100000, help="largest plateau to try")
+    parser.add_argument('--ceiling-ms', type=float, default=50.0,
+                        help="stop ramping once mean frame time exceeds this")
+    parser.add_argument('--warmup', type=int, default=30, help="unmeasured ticks per plateau")
+    parser.add_argument('--ticks', type=int, default=120, help="measured ticks per plateau")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', metavar='PATH', help="write the scaling curves as JSON")
+    args = parser.parse_args()
+
+    curves = {}
+    for subsystem in args.subsystem or SUBSYSTEMS:
+        print(f"\n🔥 Ramping {subsystem}")
+        print(f"   {'count':>8}{'frame ms':>10}{'p95 ms':>10}"
+              + "".join(f"{stage[:9]:>10}" for stage in CURVE_STAGES[:5]))
+        curves[subsystem] = ramp(subsystem, args)
+
+    if args.output:
+        report = {
+            'python': sys.version.split()[0],
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'ceiling_ms': args.ceiling_ms,
+            'curves': curves,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Wrote {args.output}")
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()